@@ -0,0 +1,85 @@
+"""
+Benchmark: UI event latency while an aslong task does CPU-bound work.
+
+A wx.Timer ticks every 10 ms on the UI thread and records how late each tick is, while a task
+runs a pure-Python CPU-bound function, first in a background section ('await aslong.bg()'), and
+then in a separate process ('await aslong.cpu(...)').  With the background thread, the UI thread
+has to compete for the GIL, and the ticks come late.
+Run directly: python bench_cpu.py
+"""
+import sys
+sys.path.insert(0, '..')
+import time, statistics
+import wx
+from wxdo import aslong
+
+TICK_MS = 10
+
+
+def crunch(n):
+    # CPU-bound, and holds the GIL.  Module-level, so that it can be pickled for aslong.cpu.
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+class BenchFrame(wx.Frame):
+    def __init__(self, n, rounds):
+        wx.Frame.__init__(self, None, title='bench_cpu')
+        self._n = n
+        self._rounds = rounds
+        self._lateness = None
+        self._last_tick = None
+        self._timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.OnTick, self._timer)
+        self._timer.Start(TICK_MS)
+        self.Run()
+
+    def OnTick(self, event):
+        now = time.perf_counter()
+        if self._lateness is not None and self._last_tick is not None:
+            self._lateness.append(max(0.0, now - self._last_tick - TICK_MS/1000))
+        self._last_tick = now
+
+    def _measure(self):
+        self._lateness = []
+        self._last_tick = None
+
+    def _report(self, label, elapsed):
+        lateness = sorted(self._lateness)
+        self._lateness = None
+        if len(lateness) == 0:
+            print('%-10s %6.2f s, no timer ticks at all' % (label, elapsed))
+            return
+        print('%-10s %6.2f s, %4d ticks, tick lateness median %6.1f ms, p99 %6.1f ms, max %6.1f ms' % (
+            label, elapsed, len(lateness), statistics.median(lateness)*1000,
+            lateness[int(len(lateness)*0.99)]*1000, lateness[-1]*1000))
+
+    @aslong.task
+    async def Run(self):
+        await aslong.cpu(crunch, 1) # start the process pool outside the measurement
+
+        self._measure()
+        t0 = time.perf_counter()
+        for _ in range(self._rounds):
+            await aslong.bg()
+            crunch(self._n)
+            await aslong.ui()
+        self._report('bg()', time.perf_counter() - t0)
+
+        self._measure()
+        t0 = time.perf_counter()
+        for _ in range(self._rounds):
+            await aslong.cpu(crunch, self._n)
+        self._report('cpu()', time.perf_counter() - t0)
+
+        self._timer.Stop()
+        self.Close()
+
+
+if __name__=='__main__':
+    app = wx.App()
+    fr = BenchFrame(n=3000000, rounds=5)
+    fr.Show(True)
+    app.MainLoop()
@@ -0,0 +1,142 @@
+"""
+Benchmark: DeepObjectList insert, erase and move latency against list size.
+
+Compares the incremental GridBagSizer update with a full rebuild of the sizer, by running the
+same operations with DeepObjectList._update_gbz replaced by _rebuild_gbz.
+Then compares refreshing the whole list with SetValue, with and without reuse_editors, and
+with and without a key, and 50 Insert's with and without a batch.
+Run directly: python bench_deep_object_list.py
+"""
+import sys
+sys.path.insert(0, '..')
+import time
+import wx
+from wxdo.deep_object_list import DeepObjectList, DeepObjectList_Parameters, DeepObjectItemEditor
+
+SIZES = [50, 200, 500, 1000]
+REPEAT = 10
+
+
+class Text_ItemEditor(DeepObjectItemEditor):
+    def Create(self):
+        self._edit = wx.TextCtrl(self.parent, -1)
+        return [self._edit]
+
+    def Destroy(self):
+        self._edit.Destroy()
+
+    def SetValue(self, value):
+        self._edit.SetValue(value)
+
+    def GetValue(self):
+        return self._edit.GetValue()
+
+
+class Parameters(DeepObjectList_Parameters):
+    def CreateObject(self, parent):
+        return 'new'
+
+    def CreateItemEditor(self, obj):
+        return Text_ItemEditor()
+
+
+def insert_top(dol):
+    dol._mkOnAddBefore(None, dol._items[0])(None)
+
+def erase_middle(dol):
+    dol._mkOnErase(None, dol._items[len(dol._items)//2])(None)
+
+def move_up(dol):
+    dol._move_select_items = {dol._items[len(dol._items)//2]}
+    dol._OnUp(None)
+
+def append(dol):
+    dol._OnAppendNew(None)
+
+
+def bench(frame, n, operation, full_rebuild):
+    dol = DeepObjectList(frame, -1, Parameters(), initial_value=['row %d' % (i,) for i in range(n)])
+    if full_rebuild:
+        dol._update_gbz = dol._rebuild_gbz
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        operation(dol)
+    elapsed = (time.perf_counter() - t0) / REPEAT
+    dol.Destroy()
+    return elapsed
+
+
+def bench_refresh(frame, n, reuse_editors):
+    dol = DeepObjectList(frame, -1, Parameters(), reuse_editors=reuse_editors,
+                         initial_value=['row %d' % (i,) for i in range(n)])
+    t0 = time.perf_counter()
+    for r in range(REPEAT):
+        dol.SetValue(['row %d, refresh %d' % (i, r) for i in range(n)])
+    elapsed = (time.perf_counter() - t0) / REPEAT
+    dol.Destroy()
+    return elapsed
+
+
+def bench_keyed_refresh(frame, n, keyed):
+    # A poll that finds one new row at the top and one row gone from the middle.
+    dol = DeepObjectList(frame, -1, Parameters(), reuse_editors=True,
+                         initial_value=['row %d' % (i,) for i in range(n)])
+    key = (lambda row: row) if keyed else None
+    t0 = time.perf_counter()
+    for r in range(REPEAT):
+        rows = ['row %d' % (i,) for i in range(-r-1, n-r-1) if i != n//2]
+        dol.SetValue(rows, key=key)
+    elapsed = (time.perf_counter() - t0) / REPEAT
+    dol.Destroy()
+    return elapsed
+
+
+def bench_import(frame, n, batched):
+    # Insert 50 rows at scattered positions, one at a time or in a batch.
+    dol = DeepObjectList(frame, -1, Parameters(), initial_value=['row %d' % (i,) for i in range(n)])
+    t0 = time.perf_counter()
+    for r in range(REPEAT):
+        if batched:
+            with dol.batch():
+                for i in range(50):
+                    dol.Insert(i * n // 50, 'imported %d' % (i,))
+        else:
+            for i in range(50):
+                dol.Insert(i * n // 50, 'imported %d' % (i,))
+    elapsed = (time.perf_counter() - t0) / REPEAT
+    dol.Destroy()
+    return elapsed
+
+
+def main():
+    wx.App()
+    frame = wx.Frame(None)
+    print('%-14s %6s %12s %12s' % ('operation', 'rows', 'full (ms)', 'incr. (ms)'))
+    for operation in [insert_top, erase_middle, move_up, append]:
+        for n in SIZES:
+            full = bench(frame, n, operation, full_rebuild=True)
+            incremental = bench(frame, n, operation, full_rebuild=False)
+            print('%-14s %6d %12.2f %12.2f' % (operation.__name__, n, full*1000, incremental*1000))
+    print()
+    print('%-14s %6s %12s %12s' % ('operation', 'rows', 'new (ms)', 'reuse (ms)'))
+    for n in SIZES:
+        new = bench_refresh(frame, n, reuse_editors=False)
+        reuse = bench_refresh(frame, n, reuse_editors=True)
+        print('%-14s %6d %12.2f %12.2f' % ('SetValue', n, new*1000, reuse*1000))
+    print()
+    print('%-14s %6s %12s %12s' % ('operation', 'rows', 'by pos. (ms)', 'keyed (ms)'))
+    for n in SIZES:
+        positional = bench_keyed_refresh(frame, n, keyed=False)
+        keyed = bench_keyed_refresh(frame, n, keyed=True)
+        print('%-14s %6d %12.2f %12.2f' % ('SetValue poll', n, positional*1000, keyed*1000))
+    print()
+    print('%-14s %6s %12s %12s' % ('operation', 'rows', 'single (ms)', 'batch (ms)'))
+    for n in SIZES:
+        single = bench_import(frame, n, batched=False)
+        batched = bench_import(frame, n, batched=True)
+        print('%-14s %6d %12.2f %12.2f' % ('Insert x50', n, single*1000, batched*1000))
+    frame.Destroy()
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: one WorkerThread per object (the aslong default) versus PoolWorker's on a shared WorkerPool.
+
+Simulates N wx objects, each running a handful of short, blocking background sections, and reports
+peak thread count and throughput.  Run directly: python bench_workerpool.py
+"""
+import sys
+sys.path.insert(0, '..')
+import time, threading
+from wxdo import workerthread
+
+
+def settle(baseline, timeout_s=5):
+    # Wait for idle threads from a previous run to time out.
+    t0 = time.monotonic()
+    while threading.active_count() > baseline and time.monotonic()-t0 < timeout_s:
+        time.sleep(0.01)
+
+
+def run(make_worker, n_objects, jobs_per_object, job_s):
+    done = threading.Semaphore(0)
+    def job():
+        time.sleep(job_s)
+        done.release()
+    threads_before = threading.active_count()
+    peak = [0]
+    stop = threading.Event()
+    def sample():
+        while not stop.is_set():
+            peak[0] = max(peak[0], threading.active_count() - threads_before - 1)
+            time.sleep(0.001)
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    t0 = time.perf_counter()
+    workers = [make_worker() for _ in range(n_objects)]
+    for _ in range(jobs_per_object):
+        for w in workers:
+            w.job(job)
+    for _ in range(n_objects * jobs_per_object):
+        done.acquire()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    sampler.join()
+    for w in workers:
+        w.close()
+    return peak[0], n_objects * jobs_per_object / elapsed
+
+
+def main():
+    n_objects, jobs_per_object, job_s = 200, 5, 0.002
+    baseline = threading.active_count()
+    print("%d objects x %d jobs of %.1f ms" % (n_objects, jobs_per_object, job_s*1000))
+    peak, rate = run(lambda: workerthread.WorkerThread(timeout_s=0.2), n_objects, jobs_per_object, job_s)
+    print("  %-28s peak threads %4d   %8.0f jobs/s" % ("WorkerThread per object", peak, rate))
+    for max_workers in [4, 16, 64]:
+        settle(baseline)
+        pool = workerthread.WorkerPool(max_workers=max_workers, timeout_s=0.2)
+        peak, rate = run(pool.worker, n_objects, jobs_per_object, job_s)
+        print("  %-28s peak threads %4d   %8.0f jobs/s" % ("WorkerPool(max_workers=%d)" % (max_workers,), peak, rate))
+        pool.close()
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Microbenchmark: WorkerThread submission overhead for many tiny jobs.
+
+Reports jobs/s end-to-end and the mean time spent in a single WorkerThread.job call.
+Run directly: python bench_workerthread.py
+"""
+import sys
+sys.path.insert(0, '..')
+import time, threading
+from wxdo import workerthread
+
+
+def bench_job(n):
+    w = workerthread.WorkerThread()
+    done = threading.Event()
+    counter = [0]
+    def tiny():
+        counter[0] += 1
+    t0 = time.perf_counter()
+    for _ in range(n):
+        w.job(tiny)
+    t_submit = time.perf_counter() - t0
+    w.job(done.set)
+    done.wait()
+    elapsed = time.perf_counter() - t0
+    w.close()
+    assert counter[0] == n
+    return n / elapsed, t_submit / n
+
+
+def bench_job_many(n):
+    w = workerthread.WorkerThread()
+    done = threading.Event()
+    counter = [0]
+    def tiny():
+        counter[0] += 1
+    t0 = time.perf_counter()
+    w.job_many(tiny for _ in range(n))
+    t_submit = time.perf_counter() - t0
+    w.job(done.set)
+    done.wait()
+    elapsed = time.perf_counter() - t0
+    w.close()
+    assert counter[0] == n
+    return n / elapsed, t_submit / n
+
+
+def bench_ping_pong(n):
+    # Submit one job at a time and wait for it: latency from submit to start, with the thread warm.
+    w = workerthread.WorkerThread()
+    ev = threading.Event()
+    latencies = []
+    def job():
+        latencies.append(time.perf_counter() - t_submit)
+        ev.set()
+    for _ in range(n):
+        ev.clear()
+        t_submit = time.perf_counter()
+        w.job(job)
+        ev.wait()
+    w.close()
+    latencies.sort()
+    return latencies[len(latencies)//2]
+
+
+def bench_churn(make_worker, bursts, gap_s):
+    # Bursts of jobs separated by idle gaps somewhat longer than the idle timeout.
+    w = make_worker()
+    done = threading.Semaphore(0)
+    for _ in range(bursts):
+        for _ in range(10):
+            w.job(lambda: None)
+        w.job(done.release)
+        done.acquire()
+        time.sleep(gap_s)
+    stats = w.stats()
+    w.close()
+    return stats
+
+
+def main():
+    timeout_s = 0.05
+    bursts, gap_s = 40, 0.08
+    print("%d bursts, %.0f ms apart, idle timeout %.0f ms" % (bursts, gap_s*1000, timeout_s*1000))
+    for name,make_worker in [
+            ("default", lambda: workerthread.WorkerThread(timeout_s=timeout_s)),
+            ("adaptive_timeout=True", lambda: workerthread.WorkerThread(timeout_s=timeout_s, adaptive_timeout=True)),
+            ("min_threads=1", lambda: workerthread.WorkerThread(timeout_s=timeout_s, min_threads=1)),
+            ]:
+        st = bench_churn(make_worker, bursts, gap_s)
+        print("  %-24s threads created %3d, retired %3d, jobs reusing a thread %4d"
+              % (name, st['threads_created'], st['threads_retired'], st['jobs_reusing_thread']))
+    print()
+
+    n = 100000
+    rate, submit = bench_job(n)
+    print("job():      %9.0f jobs/s   %6.2f us per submit" % (rate, submit*1e6))
+    rate, submit = bench_job_many(n)
+    print("job_many(): %9.0f jobs/s   %6.2f us per job submitted" % (rate, submit*1e6))
+    print("submit-to-start latency, median: %.1f us" % (bench_ping_pong(2000)*1e6,))
+
+
+if __name__=='__main__':
+    main()
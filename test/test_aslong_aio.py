@@ -0,0 +1,115 @@
+import sys
+sys.path.insert(0, '..')
+import time, asyncio, threading, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+async def add_later(a, b):
+    await asyncio.sleep(0.01)
+    return a + b
+
+async def fail_later():
+    await asyncio.sleep(0.01)
+    raise ValueError('failed')
+
+async def wait_forever(log):
+    try:
+        await asyncio.Event().wait()
+    except asyncio.CancelledError:
+        log.append('cancelled')
+        raise
+
+
+if wx is not None:
+    @aslong.task
+    async def aio_task(panel, awaitable, in_bg):
+        if in_bg:
+            await aslong.bg()
+        result = await aslong.aio(awaitable)
+        await aslong.ui()
+        return result
+
+    @aslong.task
+    async def gather_task(panel, awaitables):
+        return await aslong.gather(*awaitables)
+
+    @aslong.task
+    async def await_directly(panel):
+        await aslong.get_asyncio_loop().create_future()
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Aio(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+
+    def tearDown(self):
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        del self.app
+
+    def pump(self, until, timeout_s=10):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def test_result(self):
+        for in_bg in [False, True]:
+            handle = aio_task(self.panel, add_later(2, 3), in_bg)
+            self.pump(handle.done)
+            self.assertEqual(handle.result(), 5)
+
+    def test_exception(self):
+        handle = aio_task(self.panel, fail_later(), False)
+        self.pump(handle.done)
+        self.assertIsInstance(handle.exception(), ValueError)
+
+    def test_gather(self):
+        handle = gather_task(self.panel, [add_later(i, i) for i in range(5)])
+        self.pump(handle.done)
+        self.assertEqual(handle.result(), [0, 2, 4, 6, 8])
+
+    def test_cancel(self):
+        log = []
+        handle = aio_task(self.panel, wait_forever(log), True)
+        self.pump(lambda: handle._tip is not None and handle._tip._waiting is not None)
+        handle.cancel()
+        self.pump(handle.done)
+        self.assertTrue(handle.cancelled())
+        self.pump(lambda: log == ['cancelled'])
+
+    def test_own_loop(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            aslong.set_asyncio_loop(loop)
+            self.assertIs(aslong.get_asyncio_loop(), loop)
+            handle = aio_task(self.panel, add_later(1, 1), False)
+            self.pump(handle.done)
+            self.assertEqual(handle.result(), 2)
+        finally:
+            aslong.set_asyncio_loop(None)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def test_await_directly(self):
+        # The first section runs in the call, so the error surfaces right there.
+        with self.assertRaisesRegex(NotImplementedError, 'aslong.aio'):
+            await_directly(self.panel)
+
+
+if __name__=='__main__':
+    unittest.main()
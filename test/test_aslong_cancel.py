@@ -0,0 +1,89 @@
+import sys
+sys.path.insert(0, '..')
+import time, threading, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task
+    async def with_checkpoint(panel, running, gate, log):
+        await aslong.bg()
+        running.set()
+        gate.wait(10)
+        log.append('before checkpoint')
+        await aslong.checkpoint()
+        log.append('after checkpoint')
+        await aslong.ui()
+
+    @aslong.task
+    async def switching(panel, running, gate, log):
+        await aslong.bg()
+        running.set()
+        gate.wait(10)
+        log.append('in bg')
+        await aslong.ui()
+        log.append('in ui')
+
+    @aslong.task
+    async def quick(panel):
+        await aslong.bg()
+        await aslong.ui()
+        return 42
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Cancel(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+
+    def tearDown(self):
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        del self.app
+
+    def pump(self, until, timeout_s=10):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def run_cancelled(self, task):
+        running = threading.Event()
+        gate = threading.Event()
+        log = []
+        handle = task(self.panel, running, gate, log)
+        self.assertTrue(running.wait(10))
+        self.assertTrue(handle.cancel())
+        self.assertFalse(handle.done()) # cooperative: the task is still running
+        gate.set()
+        self.pump(handle.done)
+        self.assertTrue(handle.cancelled())
+        self.assertRaises(aslong.TaskInterruptedError, handle.result)
+        return log
+
+    def test_cancel_at_checkpoint(self):
+        self.assertEqual(self.run_cancelled(with_checkpoint), ['before checkpoint'])
+
+    def test_cancel_at_switch(self):
+        self.assertEqual(self.run_cancelled(switching), ['in bg'])
+
+    def test_cancel_after_done(self):
+        handle = quick(self.panel)
+        self.pump(handle.done)
+        self.assertFalse(handle.cancel())
+        self.assertFalse(handle.cancelled())
+        self.assertEqual(handle.result(), 42)
+
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+sys.path.insert(0, '..')
+import time, threading, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task
+    async def blocking(panel, gate, log):
+        await aslong.bg()
+        gate.wait()
+        log.append('bg done')
+        await aslong.ui()
+        log.append('ui')
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Cleanup(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+        self.gate = threading.Event()
+        self.log = []
+
+    def tearDown(self):
+        self.gate.set()
+        if self.frame:
+            aslong.cleanup(self.panel)
+            self.frame.Destroy()
+        self.pump(lambda: len(aslong._detached) == 0)
+        del self.app
+
+    def pump(self, until, timeout_s=10):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def workers_closed(self, state):
+        return all(worker._closed for worker in state.workers.values())
+
+    def test_timeout(self):
+        handle = blocking(self.panel, self.gate, self.log)
+        state = aslong._get_state(self.panel)
+        stragglers = []
+        t0 = time.monotonic()
+        aslong.cleanup(self.panel, timeout_s=0.1, on_timeout=stragglers.extend)
+        self.assertLess(time.monotonic()-t0, 1)
+        self.assertEqual(stragglers, [handle])
+        self.assertFalse(handle.done())
+        self.assertFalse(self.workers_closed(state))
+        self.gate.set()
+        self.pump(handle.done)
+        self.assertTrue(handle.cancelled())
+        self.assertEqual(self.log, ['bg done'])
+        self.assertTrue(self.workers_closed(state))
+
+    def test_timeout_logged(self):
+        handle = blocking(self.panel, self.gate, self.log)
+        with self.assertLogs('wxdo.aslong', 'WARNING'):
+            aslong.cleanup(self.panel, timeout_s=0.05)
+        self.gate.set()
+        self.pump(handle.done)
+
+    def test_nowait(self):
+        handle = blocking(self.panel, self.gate, self.log)
+        state = aslong._get_state(self.panel)
+        done = []
+        aslong.cleanup_nowait(self.panel, on_done=lambda: done.append(True))
+        self.frame.Destroy() # at once
+        self.frame = None
+        self.pump(lambda: True)
+        self.assertEqual(done, [])
+        self.gate.set()
+        self.pump(lambda: done)
+        self.assertTrue(handle.cancelled())
+        self.assertTrue(self.workers_closed(state))
+
+    def test_nowait_idle(self):
+        done = []
+        aslong.cleanup_nowait(self.panel, on_done=lambda: done.append(True))
+        self.assertEqual(done, [True])
+
+
+if __name__=='__main__':
+    unittest.main()
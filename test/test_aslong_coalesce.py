@@ -0,0 +1,61 @@
+import sys
+sys.path.insert(0, '..')
+import time, threading, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task(coalesce='latest')
+    async def search(panel, query, gate, log):
+        log.append(('start', query))
+        await aslong.bg()
+        log.append(('bg', query))
+        gate.wait(10)
+        await aslong.ui()
+        log.append(('done', query))
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_CoalesceLatest(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+
+    def tearDown(self):
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        del self.app
+
+    def pump(self, until, timeout_s=10):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def test_latest_wins(self):
+        gate = threading.Event()
+        log = []
+        search(self.panel, 'a', gate, log)
+        self.pump(lambda: ('bg', 'a') in log)
+        # 'b' waits for its turn on the background thread, behind 'a', and 'c' supersedes it
+        # before it gets it.  'a' is interrupted when it switches back to the UI thread.
+        search(self.panel, 'b', gate, log)
+        search(self.panel, 'c', gate, log)
+        gate.set()
+        self.pump(lambda: ('done', 'c') in log)
+        self.pump(lambda: not aslong.busy(self.panel))
+        self.assertEqual(log, [('start', 'a'), ('bg', 'a'), ('start', 'b'), ('start', 'c'),
+                               ('bg', 'c'), ('done', 'c')])
+
+
+if __name__=='__main__':
+    unittest.main()
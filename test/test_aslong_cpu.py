@@ -0,0 +1,74 @@
+import sys
+sys.path.insert(0, '..')
+import os, time, shutil, tempfile, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task
+    async def power(panel, in_bg):
+        if in_bg:
+            await aslong.bg()
+        result = await aslong.cpu(pow, 2, 10)
+        await aslong.ui()
+        return result
+
+    @aslong.task
+    async def make_dir(panel, path):
+        await aslong.cpu(os.mkdir, path)
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Cpu(unittest.TestCase):
+    def setUp(self):
+        aslong.set_cpu_pool(max_workers=1)
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        del self.app
+        aslong.set_cpu_pool()
+        shutil.rmtree(self.tmpdir)
+
+    def pump(self, until, timeout_s=30):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def test_result(self):
+        for in_bg in [False, True]:
+            handle = power(self.panel, in_bg)
+            self.pump(handle.done)
+            self.assertEqual(handle.result(), 1024)
+
+    def test_cancel_before_start(self):
+        # Keep the single worker process busy, so that the call is still pending when cancelled.
+        pool = aslong._get_cpu_pool()
+        busy = [pool.submit(time.sleep, 0.5) for i in range(3)]
+        path = os.path.join(self.tmpdir, 'never')
+        handle = make_dir(self.panel, path)
+        self.pump(lambda: handle._tip is not None and handle._tip._waiting is not None)
+        handle.cancel()
+        self.pump(handle.done)
+        self.assertTrue(handle.cancelled())
+        for fut in busy:
+            fut.result()
+        pool.submit(pow, 2, 3).result() # anything queued before this has run
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__=='__main__':
+    unittest.main()
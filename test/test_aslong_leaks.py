@@ -0,0 +1,80 @@
+import sys
+sys.path.insert(0, '..')
+import gc, time, threading, tracemalloc, unittest
+import concurrent.futures
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task
+    async def blocked_in_bg(panel, gate, running):
+        await aslong.bg()
+        running.set()
+        gate.wait()
+        await aslong.ui()
+        panel.SetLabel('not reached')
+
+    @aslong.task
+    async def waiting_for_future(panel, future):
+        await aslong.gather(future)
+        panel.SetLabel('not reached')
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_DestroyWithoutCleanup(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+
+    def tearDown(self):
+        self.frame.Destroy()
+        self.pump(lambda: True)
+        del self.app
+
+    def pump(self, until, timeout_s=30):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def create_and_destroy(self, n):
+        handles = []
+        for _ in range(n):
+            panel = wx.Panel(self.frame)
+            gate = threading.Event()
+            running = threading.Event()
+            handles.append(blocked_in_bg(panel, gate, running))
+            handles.append(waiting_for_future(panel, concurrent.futures.Future()))
+            self.assertTrue(running.wait(10))
+            panel.Destroy()
+            gate.set()
+        self.pump(lambda: len(aslong._live_tasks) == 0)
+        self.pump(lambda: all(handle.done() for handle in handles))
+        self.assertTrue(all(handle.cancelled() for handle in handles))
+        gc.collect()
+
+    def test_memory_growth(self):
+        threads_before = threading.active_count()
+        tracemalloc.start()
+        try:
+            self.create_and_destroy(200) # warm up
+            baseline = tracemalloc.get_traced_memory()[0]
+            self.create_and_destroy(2000)
+            growth = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(aslong._states), 0)
+        self.assertLess(growth, 500000)
+        self.pump(lambda: threading.active_count() <= threads_before + 1)
+
+
+if __name__=='__main__':
+    unittest.main()
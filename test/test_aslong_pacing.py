@@ -0,0 +1,67 @@
+import sys
+sys.path.insert(0, '..')
+import time, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task(debounce_s=0.1)
+    async def debounced(panel, n, log):
+        log.append(n)
+
+    @aslong.task(throttle_s=0.1)
+    async def throttled(panel, n, log):
+        log.append((time.monotonic(), n))
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Pacing(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+
+    def tearDown(self):
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        del self.app
+
+    def pump(self, seconds):
+        t0 = time.monotonic()
+        while time.monotonic()-t0 < seconds:
+            self.app.ProcessPendingEvents()
+            time.sleep(0.002)
+
+    def test_debounce_trailing_call(self):
+        log = []
+        for n in range(5):
+            debounced(self.panel, n, log)
+            self.pump(0.02)
+        self.assertEqual(log, [])
+        self.pump(0.3)
+        self.assertEqual(log, [4])
+
+    def test_throttle_rate(self):
+        log = []
+        t0 = time.monotonic()
+        n = 0
+        while time.monotonic()-t0 < 0.5:
+            throttled(self.panel, n, log)
+            n += 1
+            self.pump(0.01)
+        self.pump(0.3)
+        self.assertEqual(log[0][1], 0) # the first call starts right away
+        self.assertEqual(log[-1][1], n-1) # the last call isn't lost
+        self.assertGreaterEqual(len(log), 4)
+        self.assertLessEqual(len(log), 7)
+        for (t1,_),(t2,_) in zip(log, log[1:]):
+            self.assertGreaterEqual(t2-t1, 0.09)
+
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import sys
+sys.path.insert(0, '..')
+import time, threading, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    def on_progress(panel, value):
+        panel.progress_log.append(value)
+
+    @aslong.task(on_progress=on_progress, progress_hz=20)
+    async def counting(panel, n):
+        await aslong.bg()
+        for i in range(n):
+            aslong.progress(i)
+            time.sleep(0.001)
+        await aslong.ui()
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Progress(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+        self.panel.progress_log = []
+
+    def tearDown(self):
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        del self.app
+
+    def pump(self, seconds):
+        t0 = time.monotonic()
+        while time.monotonic()-t0 < seconds:
+            self.app.ProcessPendingEvents()
+            time.sleep(0.002)
+
+    def test_channel_coalesces(self):
+        received = []
+        channel = aslong.ProgressChannel(self.panel, lambda panel, value: received.append(value), max_hz=10)
+        def producer():
+            for i in range(300):
+                channel.put(i)
+                time.sleep(0.001)
+        thread = threading.Thread(target=producer)
+        thread.start()
+        t0 = time.monotonic()
+        while thread.is_alive():
+            self.pump(0.01)
+        self.pump(0.3)
+        elapsed = time.monotonic() - t0
+        self.assertEqual(received[-1], 299) # the latest value always gets through
+        self.assertEqual(received, sorted(set(received)))
+        self.assertLessEqual(len(received), elapsed*10 + 2)
+
+    def test_channel_close(self):
+        received = []
+        channel = aslong.ProgressChannel(self.panel, lambda panel, value: received.append(value))
+        channel.put(1)
+        channel.close()
+        channel.put(2)
+        self.pump(0.2)
+        self.assertEqual(received, [])
+
+    def test_task_progress(self):
+        counting(self.panel, 200)
+        t0 = time.monotonic()
+        while aslong.busy(self.panel):
+            self.pump(0.01)
+            self.assertLess(time.monotonic()-t0, 10)
+        self.pump(0.2)
+        log = self.panel.progress_log
+        self.assertEqual(log[-1], 199)
+        self.assertLess(len(log), 200)
+
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import sys
+sys.path.insert(0, '..')
+import time, threading, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+async def until_set(owner, gate, log):
+    # Interruptible: Checks for cancellation while waiting.
+    await aslong.bg()
+    try:
+        while not gate.wait(0.01):
+            await aslong.checkpoint()
+    except BaseException: # TaskInterruptedError, or GeneratorExit when closed
+        log.append('stopped')
+        raise
+    await aslong.ui()
+
+async def blocking(owner, gate):
+    # Not interruptible until the gate is set.
+    await aslong.bg()
+    gate.wait()
+    await aslong.ui()
+
+async def fail_soon(owner):
+    await aslong.bg()
+    time.sleep(0.05)
+    raise ValueError('failed')
+
+
+if wx is not None:
+    @aslong.task
+    async def fan_out(panel, owner, in_bg, *children):
+        if in_bg:
+            await aslong.bg()
+        async with aslong.TaskGroup(owner) as g:
+            handles = [g.start(child, *args) for child, *args in children]
+        return handles
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_TaskGroup(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+        self.owner_frame = wx.Frame(None)
+        self.owner = wx.Panel(self.owner_frame)
+        self.gate = threading.Event()
+        self.log = []
+
+    def tearDown(self):
+        self.gate.set()
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        if self.owner_frame:
+            aslong.cleanup(self.owner)
+            self.owner_frame.Destroy()
+        self.pump(lambda: True)
+        del self.app
+
+    def pump(self, until, timeout_s=10):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def child_states(self):
+        return [info.state for info in aslong.tasks() if info.owner is self.owner]
+
+    def test_all_done(self):
+        for in_bg in [False, True]:
+            self.gate.set()
+            handle = fan_out(self.panel, self.owner, in_bg, (until_set, self.gate, self.log), (blocking, self.gate))
+            self.pump(handle.done)
+            self.assertTrue(all(child.done() and not child.cancelled() for child in handle.result()))
+
+    def test_child_fails(self):
+        handle = fan_out(self.panel, self.owner, False, (until_set, self.gate, self.log), (fail_soon,))
+        self.pump(handle.done)
+        self.assertIsInstance(handle.exception(), ValueError)
+        self.assertEqual(self.log, ['stopped']) # the sibling was cancelled
+
+    def test_owner_destroyed(self):
+        handle = fan_out(self.panel, self.owner, True, (until_set, self.gate, self.log), (until_set, self.gate, self.log))
+        self.pump(lambda: self.child_states() == ['bg', 'bg'])
+        self.owner_frame.Destroy()
+        self.owner_frame = None
+        self.pump(handle.done)
+        with self.assertRaises(aslong.TaskInterruptedError):
+            handle.result()
+        self.assertEqual(self.log, ['stopped', 'stopped'])
+
+    def test_cleanup_with_open_group(self):
+        # cleanup of the waiting task doesn't wait for the children of its group.
+        for cancel_first in [False, True]:
+            handle = fan_out(self.panel, self.owner, True, (blocking, self.gate))
+            self.pump(lambda: self.child_states() == ['bg'] and handle._tip._waiting is not None)
+            if cancel_first:
+                handle.cancel()
+                self.pump(lambda: handle._tip._waiting is not None)
+            stragglers = []
+            aslong.cleanup(self.panel, timeout_s=2, on_timeout=stragglers.extend)
+            self.assertEqual(stragglers, [])
+            self.assertTrue(handle.done())
+            self.assertTrue(handle.cancelled())
+            self.gate.set()
+            self.pump(lambda: self.child_states() == [])
+            self.gate.clear()
+
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import sys
+sys.path.insert(0, '..')
+import time, threading, unittest
+import concurrent.futures
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task
+    async def blocking(panel, gate):
+        await aslong.bg()
+        gate.wait()
+        await aslong.ui()
+
+    @aslong.task
+    async def gathering(panel, future):
+        await aslong.gather(future)
+
+    @aslong.task
+    async def introspect(panel):
+        return [info.state for info in aslong.tasks() if info.owner is panel]
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Tasks(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+        self.gate = threading.Event()
+
+    def tearDown(self):
+        self.gate.set()
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        del self.app
+
+    def pump(self, until, timeout_s=10):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def states(self):
+        return {info.handle: info.state for info in aslong.tasks() if info.owner is self.panel}
+
+    def test_states(self):
+        never = concurrent.futures.Future()
+        first = blocking(self.panel, self.gate)
+        second = blocking(self.panel, self.gate) # PER_OBJECT: waits for the first
+        waiter = gathering(self.panel, never)
+        self.pump(lambda: self.states() == {first: 'bg', second: 'queued', waiter: 'waiting'})
+        infos = [info for info in aslong.tasks() if info.owner is self.panel]
+        self.assertEqual([info.handle for info in infos], [first, second, waiter]) # oldest first
+        self.assertEqual(infos[0].name, str(aslong._get_task_function(blocking)))
+        self.assertGreaterEqual(infos[0].time_in_state_s, 0)
+        text = aslong.snapshot()
+        self.assertIn(infos[0].name, text)
+        self.assertIn('1 bg, 1 queued, 1 waiting', text.splitlines()[-1])
+        self.gate.set()
+        never.set_result(None)
+        self.pump(lambda: first.done() and second.done() and waiter.done())
+        self.assertEqual(self.states(), {})
+
+    def test_ui(self):
+        handle = introspect(self.panel)
+        self.pump(handle.done)
+        self.assertEqual(handle.result(), ['ui'])
+
+
+if __name__=='__main__':
+    unittest.main()
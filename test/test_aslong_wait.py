@@ -0,0 +1,111 @@
+import sys
+sys.path.insert(0, '..')
+import time, unittest
+import concurrent.futures
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong
+
+
+if wx is not None:
+    @aslong.task
+    async def gather_task(panel, futures, in_bg):
+        if in_bg:
+            await aslong.bg()
+        results = await aslong.gather(*futures)
+        await aslong.ui()
+        return results
+
+    @aslong.task
+    async def wait_task(panel, futures, return_when):
+        done, not_done = await aslong.wait(futures, return_when)
+        return done, not_done
+
+    @aslong.task
+    async def unpack_in_bg(panel, future, reached):
+        await aslong.bg()
+        a, = await aslong.gather(future)
+        reached.append(a)
+        await aslong.ui()
+
+
+def fail():
+    raise ValueError('failed')
+
+def waiting(handle):
+    tip = handle._tip
+    return tip is not None and tip._waiting is not None
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_GatherWait(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.panel = wx.Panel(self.frame)
+
+    def tearDown(self):
+        aslong.cleanup(self.panel)
+        self.frame.Destroy()
+        self.pump(lambda: True)
+        del self.app
+
+    def pump(self, until, timeout_s=10):
+        t0 = time.monotonic()
+        while 1:
+            self.app.ProcessPendingEvents()
+            if until():
+                break
+            self.assertLess(time.monotonic()-t0, timeout_s)
+            time.sleep(0.001)
+
+    def test_spawn_gather(self):
+        for in_bg in [False, True]:
+            futures = [aslong.spawn(pow, 2, i) for i in range(10)]
+            handle = gather_task(self.panel, futures, in_bg)
+            self.pump(handle.done)
+            self.assertEqual(handle.result(), [2**i for i in range(10)])
+
+    def test_gather_exception(self):
+        futures = [aslong.spawn(pow, 2, 3), aslong.spawn(fail)]
+        handle = gather_task(self.panel, futures, False)
+        self.pump(handle.done)
+        self.assertIsInstance(handle.exception(), ValueError)
+
+    def test_wait_first_completed(self):
+        never = concurrent.futures.Future()
+        soon = aslong.spawn(pow, 2, 3)
+        handle = wait_task(self.panel, [never, soon], aslong.FIRST_COMPLETED)
+        self.pump(handle.done)
+        self.assertEqual(handle.result(), ({soon}, {never}))
+        never.cancel()
+
+    def test_wait_all_completed(self):
+        futures = [aslong.spawn(pow, 2, i) for i in range(5)]
+        handle = wait_task(self.panel, futures, aslong.ALL_COMPLETED)
+        self.pump(handle.done)
+        self.assertEqual(handle.result(), (set(futures), set()))
+
+    def test_cancel_while_gathering(self):
+        handle = gather_task(self.panel, [concurrent.futures.Future()], True)
+        self.pump(lambda: waiting(handle))
+        handle.cancel()
+        self.pump(handle.done)
+        self.assertTrue(handle.cancelled())
+
+    def test_cleanup_while_gathering_in_bg(self):
+        # cleanup wakes the task, which must get TaskInterruptedError, not a None result.
+        reached = []
+        handle = unpack_in_bg(self.panel, concurrent.futures.Future(), reached)
+        self.pump(lambda: waiting(handle))
+        aslong.cleanup(self.panel)
+        self.pump(handle.done)
+        self.assertTrue(handle.cancelled())
+        self.assertEqual(reached, [])
+
+
+if __name__=='__main__':
+    unittest.main()
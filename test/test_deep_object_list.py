@@ -0,0 +1,384 @@
+import sys
+sys.path.insert(0, '..')
+import unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo.deep_object_list import DeepObjectList, DeepObjectList_Parameters, DeepObjectItemEditor
+    from wxdo.deep_object_list import _sizer_item_object
+
+
+if wx is not None:
+    class Text_ItemEditor(DeepObjectItemEditor):
+        def Create(self):
+            self.text = wx.TextCtrl(self.parent, -1)
+            return [self.text]
+
+        def Destroy(self):
+            self.text.Destroy()
+
+        def SetValue(self, value):
+            self.text.SetValue(value)
+
+        def GetValue(self):
+            return self.text.GetValue()
+
+
+    class Parameters(DeepObjectList_Parameters):
+        def __init__(self):
+            self.created = 0
+            self.confirm_erase = True
+
+        def CreateObject(self, parent):
+            self.created += 1
+            return 'new %d' % (self.created,)
+
+        def ConfirmErase(self, parent, rowno, value):
+            return self.confirm_erase
+
+        def CreateItemEditor(self, obj):
+            return Text_ItemEditor()
+
+
+class DeepObjectList_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.param = Parameters()
+
+    def tearDown(self):
+        self.frame.Destroy()
+        del self.app
+
+    def make_list(self, value, **kwargs):
+        return DeepObjectList(self.frame, -1, self.param, initial_value=value, **kwargs)
+
+    def check_rows(self, dol, expected):
+        # The value, and every item's controls and buttons in the sizer row for its position.
+        self.assertEqual(dol.GetValue(), expected)
+        for rowno,it in enumerate(dol._items):
+            self.assertEqual(it.rowno, rowno)
+            for x,sz_it in it.gbz_positions:
+                self.assertEqual(dol._gbz.GetItemPosition(_sizer_item_object(sz_it)).GetRow(), dol._y0 + rowno)
+        if dol._append_but is not None:
+            self.assertEqual(dol._gbz.GetItemPosition(dol._append_but).GetRow(), dol._y0 + len(expected))
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_IncrementalUpdate(DeepObjectList_TestCase):
+    def test_add_before(self):
+        dol = self.make_list(['a', 'b', 'c'])
+        dol._mkOnAddBefore(None, dol._items[1])(None)
+        self.check_rows(dol, ['a', 'new 1', 'b', 'c'])
+        dol._mkOnAddBefore(None, dol._items[0])(None)
+        self.check_rows(dol, ['new 2', 'a', 'new 1', 'b', 'c'])
+
+    def test_append(self):
+        dol = self.make_list(['a'])
+        dol._OnAppendNew(None)
+        dol._OnAppendNew(None)
+        self.check_rows(dol, ['a', 'new 1', 'new 2'])
+
+    def test_erase(self):
+        dol = self.make_list(['a', 'b', 'c'])
+        editor = dol.GetItemEditors()[1]
+        dol._mkOnErase(None, dol._items[1])(None)
+        self.check_rows(dol, ['a', 'c'])
+        self.assertFalse(editor.text) # destroyed
+        self.param.confirm_erase = False
+        dol._mkOnErase(None, dol._items[0])(None)
+        self.check_rows(dol, ['a', 'c'])
+
+    def test_move(self):
+        dol = self.make_list(['a', 'b', 'c', 'd'])
+        dol._move_select_items = {dol._items[2], dol._items[3]}
+        dol._OnUp(None)
+        self.check_rows(dol, ['a', 'c', 'd', 'b'])
+        dol._OnUp(None)
+        self.check_rows(dol, ['c', 'd', 'a', 'b'])
+        dol._OnUp(None) # at the top already
+        self.check_rows(dol, ['c', 'd', 'a', 'b'])
+        dol._OnDown(None)
+        self.check_rows(dol, ['a', 'c', 'd', 'b'])
+
+    def test_mixed(self):
+        dol = self.make_list(['row %d' % (i,) for i in range(10)])
+        expected = dol.GetValue()
+        dol._mkOnErase(None, dol._items[3])(None)
+        del expected[3]
+        dol._mkOnAddBefore(None, dol._items[5])(None)
+        expected.insert(5, 'new 1')
+        dol._move_select_items = {dol._items[0]}
+        dol._OnDown(None)
+        expected[0:2] = [expected[1], expected[0]]
+        dol._OnAppendNew(None)
+        expected.append('new 2')
+        self.check_rows(dol, expected)
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Virtual(DeepObjectList_TestCase):
+    rows = ['row %d' % (i,) for i in range(300)]
+
+    def make_virtual_list(self, value):
+        dol = self.make_list(value, virtual=True, virtual_margin=2)
+        dol._update_virtual()
+        return dol
+
+    def view(self, dol, top, bottom):
+        dol._visible_span = lambda: (top, bottom)
+        dol._update_virtual()
+
+    def materialized(self, dol):
+        return [it.rowno for it in dol._items if it.widget is not None]
+
+    def rows_in(self, dol, top, bottom):
+        rowheights = dol._gbz.GetRowHeights()
+        y = sum(rowheights[:dol._y0])
+        rows = []
+        for rowno in range(len(dol._items)):
+            h = rowheights[dol._y0 + rowno]
+            if y + h > top and y < bottom:
+                rows.append(rowno)
+            y += h
+        return rows
+
+    def test_materialized_rows(self):
+        dol = self.make_virtual_list(self.rows)
+        self.view(dol, 0, 100)
+        top_rows = self.materialized(dol)
+        self.assertEqual(top_rows[0], 0)
+        self.assertEqual(top_rows, list(range(len(top_rows)))) # contiguous
+        self.assertLess(len(top_rows), 20)
+        for top in [4500, 3000, 8000]:
+            self.view(dol, top, top+100)
+            rows = self.materialized(dol)
+            visible = self.rows_in(dol, top, top+100)
+            self.assertTrue(set(visible) <= set(rows))
+            self.assertEqual(rows, list(range(rows[0], rows[0]+len(rows))))
+            self.assertLessEqual(len(rows), len(visible) + 2*2 + 2) # plus the margins
+            self.assertNotIn(0, rows)
+        self.check_rows(dol, self.rows)
+
+    def test_round_trip(self):
+        dol = self.make_virtual_list(self.rows)
+        self.assertEqual(dol.GetValue(), self.rows) # mostly never materialized
+        self.assertIsNone(dol.GetItemEditors()[-1])
+        dol.GetItemEditors()[0].text.SetValue('edited')
+        self.view(dol, 4500, 4600)
+        self.assertIsNone(dol.GetItemEditors()[0]) # parked
+        expected = ['edited'] + self.rows[1:]
+        self.assertEqual(dol.GetValue(), expected)
+        self.view(dol, 0, 100)
+        self.assertEqual(dol.GetItemEditors()[0].GetValue(), 'edited')
+        self.assertEqual(dol.GetValue(), expected)
+
+    def test_shrink(self):
+        dol = self.make_virtual_list(self.rows)
+        dol.SetValue(self.rows[:10])
+        dol._update_virtual()
+        self.check_rows(dol, self.rows[:10])
+        self.assertEqual(dol._gbz.GetItemCount(), sum(len(it.gbz_positions) for it in dol._items)
+                         + len(dol._fixed_adds) + (dol._append_but is not None))
+
+
+if wx is not None:
+    class Int_ItemEditor(Text_ItemEditor):
+        def SetValue(self, value):
+            self.text.SetValue(str(value))
+
+        def GetValue(self):
+            return int(self.text.GetValue())
+
+
+    class Typed_Parameters(Parameters):
+        # Text editors for strings, int editors for ints.  Counts the editors created.
+        def __init__(self):
+            Parameters.__init__(self)
+            self.editors_created = 0
+
+        def CreateItemEditor(self, obj):
+            self.editors_created += 1
+            return Int_ItemEditor() if isinstance(obj, int) else Text_ItemEditor()
+
+        def ItemEditorClass(self, obj):
+            return Int_ItemEditor if isinstance(obj, int) else Text_ItemEditor
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_ReuseEditors(DeepObjectList_TestCase):
+    def setUp(self):
+        DeepObjectList_TestCase.setUp(self)
+        self.param = Typed_Parameters()
+
+    def same_bitmap(self, bm1, bm2):
+        return bm1.ConvertToImage().GetData() == bm2.ConvertToImage().GetData()
+
+    def test_keep_editors(self):
+        dol = self.make_list(['a', 'b', 'c'], reuse_editors=True)
+        editors = dol.GetItemEditors()
+        created = self.param.editors_created
+        dol.SetValue(['x', 'y', 'z'])
+        self.check_rows(dol, ['x', 'y', 'z'])
+        self.assertEqual(dol.GetItemEditors(), editors)
+        self.assertEqual(self.param.editors_created, created) # ItemEditorClass, no editors created
+
+    def test_retype(self):
+        dol = self.make_list(['a', 'b', 'c'], reuse_editors=True)
+        editors = dol.GetItemEditors()
+        dol.SetValue(['a', 2, 'c'])
+        self.check_rows(dol, ['a', 2, 'c'])
+        new_editors = dol.GetItemEditors()
+        self.assertIs(new_editors[0], editors[0])
+        self.assertIsInstance(new_editors[1], Int_ItemEditor)
+        self.assertIs(new_editors[2], editors[2])
+        dol.SetValue(['a', 'b', 'c']) # the pooled text editor comes back
+        self.assertEqual(dol.GetItemEditors(), editors)
+
+    def test_reuse_erased(self):
+        dol = self.make_list(['a', 'b', 'c'], reuse_editors=True)
+        erased = dol._items[1]
+        editor = erased.widget
+        dol._show_move_icon(erased, True) # as by pressing the mouse button on it
+        dol._mkOnErase(None, erased)(None)
+        self.check_rows(dol, ['a', 'c'])
+        self.assertTrue(editor.text) # kept
+        created = self.param.editors_created
+        dol._OnAppendNew(None)
+        self.check_rows(dol, ['a', 'c', 'new 1'])
+        self.assertIs(dol.GetItemEditors()[2], editor)
+        self.assertEqual(self.param.editors_created, created)
+        self.assertTrue(self.same_bitmap(dol._items[2].move_button.GetBitmap(), dol._up_down_bm))
+
+    def test_pool_size(self):
+        dol = self.make_list(['row %d' % (i,) for i in range(10)], reuse_editors=True, editor_pool_size=3)
+        editors = dol.GetItemEditors()
+        dol.SetValue([])
+        self.check_rows(dol, [])
+        self.assertEqual([bool(ed.text) for ed in editors].count(True), 3)
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_KeyedSetValue(DeepObjectList_TestCase):
+    def setUp(self):
+        DeepObjectList_TestCase.setUp(self)
+        self.param = Typed_Parameters()
+
+    def key(self, value):
+        return str(value)[0]
+
+    def test_same_editors(self):
+        dol = self.make_list([])
+        dol.SetValue(['a1', 'b1', 'c1', 'd1'], key=self.key)
+        editors = dict(zip('abcd', dol.GetItemEditors()))
+        dol.SetValue(['e1', 'c2', 'a1', 'b1'], key=self.key) # d gone, e new, c changed, order changed
+        self.check_rows(dol, ['e1', 'c2', 'a1', 'b1'])
+        new_editors = dol.GetItemEditors()
+        self.assertEqual(new_editors[1:], [editors['c'], editors['a'], editors['b']])
+        self.assertNotIn(new_editors[0], editors.values())
+
+    def test_gui_added_item(self):
+        # Items added through the GUI are keyed by their value.
+        dol = self.make_list([])
+        dol.SetValue(['a1', 'b1'], key=self.key)
+        dol._OnAppendNew(None)
+        added = dol.GetItemEditors()[2]
+        dol.SetValue(['n1', 'a1'], key=self.key)
+        self.check_rows(dol, ['n1', 'a1'])
+        self.assertIs(dol.GetItemEditors()[0], added)
+
+    def test_duplicate_keys(self):
+        dol = self.make_list([])
+        dol.SetValue(['a1', 'b1'], key=self.key)
+        with self.assertRaises(ValueError):
+            dol.SetValue(['a1', 'a2'], key=self.key)
+        self.check_rows(dol, ['a1', 'b1']) # unchanged
+
+    def test_retype(self):
+        dol = self.make_list([])
+        dol.SetValue(['1', 'b'], key=self.key)
+        editors = dol.GetItemEditors()
+        dol.SetValue(['b', 1], key=self.key) # same key, now an int
+        self.check_rows(dol, ['b', 1])
+        new_editors = dol.GetItemEditors()
+        self.assertIs(new_editors[0], editors[1])
+        self.assertIsInstance(new_editors[1], Int_ItemEditor)
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_InsertRemoveMove(DeepObjectList_TestCase):
+    def test_row_order(self):
+        dol = self.make_list(['a', 'b', 'c'])
+        dol.Insert(1, 'x')
+        self.check_rows(dol, ['a', 'x', 'b', 'c'])
+        dol.Insert(4, 'y')
+        self.check_rows(dol, ['a', 'x', 'b', 'c', 'y'])
+        dol.Remove(0)
+        self.check_rows(dol, ['x', 'b', 'c', 'y'])
+        dol.Move(0, 3)
+        self.check_rows(dol, ['b', 'c', 'y', 'x'])
+        dol.Move(2, 0)
+        self.check_rows(dol, ['y', 'b', 'c', 'x'])
+
+    def test_batch(self):
+        dol = self.make_list(['row %d' % (i,) for i in range(10)])
+        layouts = []
+        dol.SetLayoutCallback(lambda: layouts.append(True))
+        expected = dol.GetValue()
+        with dol.batch():
+            for i in range(5):
+                dol.Insert(i*2, 'new %d' % (i,))
+                expected.insert(i*2, 'new %d' % (i,))
+            with dol.batch():
+                dol.Move(0, 5)
+                expected.insert(5, expected.pop(0))
+            dol.Remove(3)
+            del expected[3]
+            self.assertTrue(dol.IsFrozen())
+            self.assertEqual(dol.GetValue(), expected)
+            self.assertEqual(layouts, [])
+        self.assertFalse(dol.IsFrozen())
+        self.check_rows(dol, expected)
+        self.assertEqual(layouts, [True])
+
+    def test_insert_remove_in_batch(self):
+        dol = self.make_list(['a', 'b'])
+        with dol.batch():
+            dol.Insert(0, 'x')
+            dol.Remove(0)
+        self.check_rows(dol, ['a', 'b'])
+
+    def test_set_value_in_batch(self):
+        dol = self.make_list(['a', 'b'])
+        with dol.batch():
+            dol.SetValue(['c', 'd'])
+            dol.Insert(1, 'x')
+            self.assertEqual(dol.GetValue(), ['c', 'x', 'd'])
+            dol.SetValue(['e'])
+            dol.Remove(0)
+            dol.Insert(0, 'y')
+        self.check_rows(dol, ['y'])
+
+    def test_keyed_set_value_in_batch(self):
+        dol = self.make_list([])
+        dol.SetValue(['a1', 'b1'], key=lambda value: value[0])
+        with dol.batch():
+            dol.Insert(0, 'c1')
+            editor = dol.GetItemEditors()[0]
+            dol.SetValue(['b1', 'c2'], key=lambda value: value[0])
+            self.assertIs(dol.GetItemEditors()[1], editor)
+        self.check_rows(dol, ['b1', 'c2'])
+
+    def test_reuse_editors_in_batch(self):
+        dol = self.make_list(['a', 'b'], reuse_editors=True)
+        with dol.batch():
+            dol.Insert(0, 'x')
+            dol.SetValue(['c', 'd', 'e'])
+            dol.Remove(1)
+        self.check_rows(dol, ['c', 'e'])
+
+
+if __name__=='__main__':
+    unittest.main()
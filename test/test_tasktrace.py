@@ -0,0 +1,64 @@
+import sys
+sys.path.insert(0, '..')
+import json, threading, unittest
+from wxdo import tasktrace
+
+
+def mk_section(n, side='bg'):
+    return tasktrace.Section('Frame.OnExport', 'exportframe', side, 1234, 10.0+n, 10.5+n, 12.0+n)
+
+
+class Test_Section(unittest.TestCase):
+    def test_durations(self):
+        section = mk_section(0)
+        self.assertEqual(section.queue_wait_s, 0.5)
+        self.assertEqual(section.run_s, 1.5)
+        self.assertEqual(section._replace(queued=None).queue_wait_s, 0.0)
+
+
+class Test_Sinks(unittest.TestCase):
+    def test_ring_buffer(self):
+        ring = tasktrace.RingBuffer(maxlen=3)
+        for n in range(5):
+            ring(mk_section(n))
+        self.assertEqual([s.queued for s in ring.sections()], [12.0, 13.0, 14.0])
+        ring.clear()
+        self.assertEqual(ring.sections(), [])
+
+    def test_chrome_trace(self):
+        trace = tasktrace.ChromeTrace()
+        trace(mk_section(0, 'ui'))
+        trace(mk_section(1, 'bg'))
+        doc = json.loads(trace.dumps())
+        events = doc['traceEvents']
+        self.assertEqual([ev['cat'] for ev in events], ['ui', 'bg'])
+        self.assertEqual(events[0]['ph'], 'X')
+        self.assertEqual(events[0]['name'], 'Frame.OnExport')
+        self.assertEqual(events[0]['tid'], 1234)
+        self.assertAlmostEqual(events[0]['ts'], 10.5e6)
+        self.assertAlmostEqual(events[0]['dur'], 1.5e6)
+        self.assertAlmostEqual(events[0]['args']['queue_wait_ms'], 500.0)
+        self.assertEqual(events[0]['args']['wxobj'], 'exportframe')
+
+    def test_dumps_while_recording(self):
+        trace = tasktrace.ChromeTrace(maxlen=1000)
+        for n in range(1000):
+            trace(mk_section(n))
+        stop = threading.Event()
+        def record():
+            n = 0
+            while not stop.is_set():
+                trace(mk_section(n))
+                n += 1
+        thread = threading.Thread(target=record)
+        thread.start()
+        try:
+            for i in range(50):
+                self.assertEqual(len(json.loads(trace.dumps())['traceEvents']), 1000)
+        finally:
+            stop.set()
+            thread.join()
+
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+sys.path.insert(0, '..')
+import time, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import aslong, watchdog
+
+
+if wx is not None:
+    @aslong.task
+    async def block_ui(frame, seconds):
+        time.sleep(seconds)
+        await aslong.bg()
+        await aslong.ui()
+        return 'done'
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_StallWatchdog(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.stalls = []
+        self.dog = watchdog.StallWatchdog(threshold_s=0.1, interval_s=0.02, on_stall=self.stalls.append)
+
+    def tearDown(self):
+        self.dog.stop()
+        aslong.cleanup(self.frame)
+        self.frame.Destroy()
+        self.pump(0.05)
+        del self.app
+
+    def pump(self, seconds):
+        t0 = time.monotonic()
+        while time.monotonic()-t0 < seconds:
+            self.app.ProcessPendingEvents()
+            time.sleep(0.005)
+
+    def test_no_stall(self):
+        self.dog.start()
+        self.pump(0.3)
+        stats = self.dog.stats()
+        self.assertEqual(stats['stalls'], 0)
+        self.assertIsNotNone(stats['last_delay_s'])
+        self.assertEqual(self.stalls, [])
+
+    def test_stall(self):
+        self.dog.start()
+        self.pump(0.1)
+        time.sleep(0.4) # the UI thread is unresponsive
+        self.pump(0.2)
+        self.assertEqual(self.dog.stats()['stalls'], 1)
+        stall, = self.stalls
+        self.assertGreaterEqual(stall.delay_s, 0.1)
+        self.assertIn('test_stall', ''.join(stall.stack))
+        self.assertIsNone(stall.task)
+
+    def test_stall_in_task_on_same_window(self):
+        # The watchdog doesn't take the WxQueue that aslong uses for the window.
+        self.dog.start()
+        self.pump(0.1)
+        handle = block_ui(self.frame, 0.4)
+        self.pump(0.3)
+        self.assertTrue(handle.done())
+        self.assertEqual(handle.result(), 'done')
+        stall, = self.stalls
+        self.assertEqual(stall.task, str(aslong._get_task_function(block_ui)))
+        self.assertIn('block_ui', stall.coroutine_frame)
+
+    def test_restart(self):
+        self.dog.start()
+        self.pump(0.1)
+        self.dog.stop()
+        self.dog.start()
+        self.pump(0.1)
+        self.assertEqual(self.dog.stats()['stalls'], 0)
+
+
+if __name__=='__main__':
+    unittest.main()
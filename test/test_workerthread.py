@@ -64,6 +64,145 @@ class Test_WorkerThread(unittest.TestCase):
              ]
             )
 
+    def test_priority(self):
+        w = workerthread.WorkerThread(timeout_s=0.1)
+        gate = threading.Event()
+        done = threading.Event()
+        order = []
+        w.job(gate.wait) # hold the thread while the rest are queued
+        for name,priority in [('a',0), ('b',-1), ('c',5), ('d',0), ('e',5), ('f',-1)]:
+            w.job(lambda name=name: order.append(name), priority=priority)
+        w.job(done.set, priority=-10)
+        gate.set()
+        self.assertTrue(done.wait(10))
+        self.assertEqual(order, ['c', 'e', 'a', 'd', 'b', 'f'])
+        w.close()
+
+    def test_job_many(self):
+        w = workerthread.WorkerThread(timeout_s=0.1)
+        gate = threading.Event()
+        done = threading.Event()
+        order = []
+        w.job(gate.wait) # hold the thread while the rest are queued
+        w.job_many([lambda n=n: order.append(n) for n in range(1000)])
+        w.job_many([lambda: order.append('first')], priority=1)
+        w.job(done.set)
+        gate.set()
+        self.assertTrue(done.wait(10))
+        self.assertEqual(order, ['first'] + list(range(1000)))
+        w.close()
+        self.assertRaises(RuntimeError, w.job, done.set)
+
+    def test_churn(self):
+        for options,expected_created in [
+                (dict(), 3),
+                (dict(min_threads=1), 1),
+                ]:
+            w = workerthread.WorkerThread(timeout_s=0.02, **options)
+            done = threading.Semaphore(0)
+            for _ in range(3):
+                w.job(done.release)
+                self.assertTrue(done.acquire(timeout=10))
+                time.sleep(0.1)
+            st = w.stats()
+            self.assertEqual(st['threads_created'], expected_created, options)
+            self.assertEqual(st['threads_retired'], expected_created - (1 if options else 0), options)
+            w.close()
+
+    def run_keyed_round(self, w, submit, keys, jobs_per_key, sleep_s=0.01):
+        # Run jobs_per_key jobs for each key, submitted with submit(jobs).  Checks that jobs with
+        # the same key run one at a time, in order.  Returns the max. number of jobs running at once.
+        lock = threading.Lock()
+        running = {} # key => number of jobs running
+        overlaps = []
+        max_running_total = [0]
+        order = {key:[] for key in keys}
+        def mk_job(key, i):
+            def job():
+                with lock:
+                    running[key] = running.get(key, 0) + 1
+                    if running[key] > 1:
+                        overlaps.append(key)
+                    max_running_total[0] = max(max_running_total[0], sum(running.values()))
+                time.sleep(sleep_s)
+                with lock:
+                    running[key] -= 1
+                    order[key].append(i)
+            job.key = key
+            return job
+        submit([mk_job(key, i) for i in range(jobs_per_key) for key in keys])
+        self.assertLessEqual(w.stats()['threads'], w._max_workers)
+        t0 = time.monotonic()
+        while not w.peek_idle():
+            time.sleep(0.01)
+            self.assertLess(time.monotonic()-t0, 10)
+        self.assertEqual(overlaps, [])
+        for key in keys:
+            self.assertEqual(order[key], list(range(jobs_per_key)))
+        return max_running_total[0]
+
+    def test_ordering_key(self):
+        w = workerthread.WorkerThread(timeout_s=0.1, max_workers=3, ordering_key=lambda job: job.key)
+        def submit_one_by_one(jobs):
+            for job in jobs:
+                w.job(job)
+        for submit in [submit_one_by_one, w.job_many]:
+            max_running = self.run_keyed_round(w, submit, 'abcdef', 5)
+            self.assertGreater(max_running, 1)
+            self.assertLessEqual(max_running, 3)
+        t0 = time.monotonic()
+        while w.stats()['threads'] > 0:
+            time.sleep(0.01)
+            self.assertLess(time.monotonic()-t0, 10)
+        w.close()
+
+    def test_burst_after_idle(self):
+        # A burst finding one idle thread waiting must still fan out to max_workers threads.
+        w = workerthread.WorkerThread(min_threads=1, max_workers=4)
+        def submit_one_by_one(jobs):
+            for job in jobs:
+                w.job(job)
+        for submit in [submit_one_by_one, w.job_many]:
+            self.run_keyed_round(w, submit, 'a', 1) # leaves one thread idle
+            time.sleep(0.05)
+            max_running = self.run_keyed_round(w, submit, 'abcdefgh', 5, sleep_s=0.05)
+            self.assertEqual(max_running, 4)
+        w.close()
+
+
+class Test_WorkerPool(unittest.TestCase):
+    def test_serial_per_worker_parallel_across(self):
+        pool = workerthread.WorkerPool(max_workers=3, timeout_s=0.1)
+        lock = threading.Lock()
+        running = {} # worker number => number of jobs running
+        max_running_total = [0]
+        order = {n:[] for n in range(6)}
+        def mk_job(n, i):
+            def job():
+                with lock:
+                    running[n] = running.get(n, 0) + 1
+                    self.assertEqual(running[n], 1)
+                    max_running_total[0] = max(max_running_total[0], sum(running.values()))
+                time.sleep(0.01)
+                with lock:
+                    running[n] -= 1
+                    order[n].append(i)
+            return job
+        workers = [pool.worker() for _ in range(6)]
+        for i in range(5):
+            for n,w in enumerate(workers):
+                w.job(mk_job(n, i))
+        self.assertLessEqual(pool.number_of_threads(), 3)
+        t0 = time.monotonic()
+        while not all(w.peek_idle() for w in workers):
+            time.sleep(0.01)
+            self.assertLess(time.monotonic()-t0, 10)
+        for n in range(6):
+            self.assertEqual(order[n], list(range(5)))
+        self.assertGreater(max_running_total[0], 1)
+        self.assertLessEqual(max_running_total[0], 3)
+        pool.close()
+
 
 if __name__=='__main__':
     unittest.main()
\ No newline at end of file
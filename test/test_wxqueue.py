@@ -0,0 +1,92 @@
+import sys
+sys.path.insert(0, '..')
+import time, unittest
+try:
+    import wx
+except ImportError:
+    wx = None
+else:
+    from wxdo import wxqueue, aslong
+
+
+if wx is not None:
+    @aslong.task
+    async def roundtrip(frame):
+        await aslong.bg()
+        await aslong.ui()
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_TimeBudget(unittest.TestCase):
+    def setUp(self):
+        self.app = wx.App()
+        self.frame = wx.Frame(None)
+        self.received = []
+
+    def tearDown(self):
+        aslong.cleanup(self.frame)
+        self.frame.Destroy()
+        del self.app
+
+    def on_item(self, frame, item):
+        self.received.append(item)
+        time.sleep(0.002)
+
+    def test_stats(self):
+        wxq = wxqueue.WxQueue(self.frame, self.on_item)
+        for i in range(5):
+            wxq.put(i)
+        self.assertEqual(wxq.GetStats()['depth'], 5)
+        self.app.ProcessPendingEvents()
+        self.assertEqual(self.received, list(range(5)))
+        stats = wxq.GetStats()
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['max_depth'], 5)
+        self.assertEqual(stats['delivered'], 5)
+        self.assertEqual(stats['reposts'], 0)
+        self.assertGreater(stats['max_latency_s'], 0)
+        self.assertLessEqual(stats['mean_latency_s'], stats['max_latency_s'])
+        wxq.ResetStats()
+        stats = wxq.GetStats()
+        self.assertEqual((stats['max_depth'], stats['delivered'], stats['max_latency_s']), (0, 0, 0.0))
+
+    def test_repost(self):
+        wxq = wxqueue.WxQueue(self.frame, self.on_item, time_budget_s=0.01)
+        for i in range(50):
+            wxq.put(i)
+        # One event handles about 0.01/0.002 items, and posts a new event for the rest.
+        t0 = time.monotonic()
+        while len(self.received) < 50:
+            self.app.ProcessPendingEvents()
+            self.assertLess(time.monotonic()-t0, 10)
+        self.assertEqual(self.received, list(range(50)))
+        self.assertGreater(wxq.GetStats()['reposts'], 0)
+
+    def test_aslong_queue_stats(self):
+        self.assertIsNone(aslong.queue_stats(self.frame))
+        handle = roundtrip(self.frame)
+        t0 = time.monotonic()
+        while not handle.done():
+            self.app.ProcessPendingEvents()
+            self.assertLess(time.monotonic()-t0, 10)
+            time.sleep(0.001)
+        self.assertGreaterEqual(aslong.queue_stats(self.frame)['delivered'], 1)
+
+
+@unittest.skipIf(wx is None, 'wxPython not installed')
+class Test_Priority(unittest.TestCase):
+    def test_order(self):
+        wxq = wxqueue.WxQueue(None, None)
+        wxq.put('low 1', priority=-1)
+        wxq.put('normal 1')
+        wxq.put('high 1', priority=5)
+        wxq.put_nowait('normal 2')
+        wxq.put('high 2', priority=5)
+        wxq.put('low 2', priority=-1)
+        order = [wxq.get_nowait() for i in range(6)]
+        self.assertEqual(order, ['high 1', 'high 2', 'normal 1', 'normal 2', 'low 1', 'low 2'])
+        self.assertTrue(wxq.empty())
+
+
+if __name__=='__main__':
+    unittest.main()
@@ -1,129 +1,893 @@
-import types, sys, functools
-from . import wxqueue, workerthread
+import types, sys, functools, time, threading, queue, logging, weakref, collections
+import concurrent.futures, multiprocessing, asyncio, inspect
+from concurrent.futures import FIRST_COMPLETED, FIRST_EXCEPTION, ALL_COMPLETED
+import wx
+from . import wxqueue, workerthread, tasktrace
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadBackend:
+    """!
+    @brief Background work runs on a WorkerThread dedicated to the wx object.
+    @detail
+    This is the default backend.  Every wx object that runs a task gets its own thread.
+    """
+    def __init__(self, **options):
+        """!
+        @param[in] options	WorkerThread options, e.g. timeout_s=5 or adaptive_timeout=True.
+        """
+        self._options = options
+
+    def new_worker(self):
+        return workerthread.WorkerThread(**self._options)
+
+
+class PoolBackend:
+    """!
+    @brief Background work runs on a shared, bounded pool of threads.
+    @detail
+    Background sections for the same wx object still run one at a time, but sections for different
+    wx objects run in parallel, up to max_workers at a time.
+    """
+    def __init__(self, max_workers=None, timeout_s=None):
+        """!
+        @param[in] max_workers	Maximum number of threads in the pool.
+        @param[in] timeout_s	Idle duration before a pool thread is shuttered.
+        """
+        self.pool = workerthread.WorkerPool(max_workers=max_workers, timeout_s=timeout_s)
+
+    def new_worker(self):
+        return self.pool.worker()
+
+
+_default_backend = ThreadBackend()
+_shared_pool_backend = None # created on first use by a POOL policy task
+_shared_pool_backend_lock = threading.Lock()
+_dispatch_time_budget_s = None
+_tracer = None # called with a tasktrace.Section for every task section, if set
+_cpu_pool = None # ProcessPoolExecutor for aslong.cpu, created on first use
+_cpu_pool_options = dict(max_workers=None, start_method=None)
+_cpu_pool_lock = threading.Lock()
+_asyncio_loop = None # event loop for aslong.aio, running on a helper thread
+_asyncio_loop_lock = threading.Lock()
+
+def set_default_backend(backend):
+    """!
+    @brief Select the backend for tasks that don't specify one.
+    @param[in] backend	A ThreadBackend or PoolBackend.
+    @detail
+    Affects wx objects that haven't yet run a task using the default backend.
+    """
+    global _default_backend
+    _default_backend = backend
+
+
+def set_dispatch_time_budget(time_budget_s):
+    """!
+    @brief Limit the time spent running UI-side continuations per wx event.
+    @param[in] time_budget_s	Seconds, e.g. 0.008, or None for no limit (the default).
+    @detail
+    When many continuations are queued at once, the remaining ones are run in a later event,
+    keeping the UI responsive.  See wxqueue.WxQueue.  Affects wx objects that haven't yet run a task.
+    """
+    global _dispatch_time_budget_s
+    _dispatch_time_budget_s = time_budget_s
+
+
+def set_tracer(sink):
+    """!
+    @brief Record the timing of every task section: Time queued, and time running on each side.
+    @param[in] sink	Called as sink(section) with a tasktrace.Section, from whichever thread ran
+			the section.  E.g. a tasktrace.RingBuffer or a tasktrace.ChromeTrace.
+			None to stop tracing (the default).
+    """
+    global _tracer
+    _tracer = sink
+
+
+def set_cpu_pool(max_workers=None, start_method=None):
+    """!
+    @brief Configure the process pool used by aslong.cpu.
+    @param[in] max_workers	Number of worker processes.  None means the number of CPUs.
+    @param[in] start_method	multiprocessing start method: 'spawn', 'fork' or 'forkserver'.
+				None means the platform default.
+    @detail
+    A pool already started is shut down, once the calls in progress on it have finished.
+    """
+    global _cpu_pool
+    with _cpu_pool_lock:
+        old_pool, _cpu_pool = _cpu_pool, None
+        _cpu_pool_options.update(max_workers=max_workers, start_method=start_method)
+    if old_pool is not None:
+        old_pool.shutdown(wait=False)
+
+
+def _get_cpu_pool():
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            start_method = _cpu_pool_options['start_method']
+            if start_method is None:
+                mp_context = None
+            else:
+                mp_context = multiprocessing.get_context(start_method)
+            _cpu_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=_cpu_pool_options['max_workers'], mp_context=mp_context)
+        return _cpu_pool
+
+
+def set_asyncio_loop(loop):
+    """!
+    @brief Use an existing asyncio event loop for aslong.aio.
+    @param[in] loop	An asyncio event loop, running on a thread other than the UI thread.
+    @detail
+    By default, aslong.aio starts an event loop of its own, on a helper thread, on first use.
+    """
+    global _asyncio_loop
+    with _asyncio_loop_lock:
+        _asyncio_loop = loop
+
+
+def get_asyncio_loop():
+    """!
+    @brief The asyncio event loop used by aslong.aio, started if necessary.
+    """
+    global _asyncio_loop
+    with _asyncio_loop_lock:
+        if _asyncio_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='aslong-asyncio', daemon=True)
+            thread.start()
+            _asyncio_loop = loop
+        return _asyncio_loop
+
+
+def _run_on_asyncio_loop(awaitable):
+    # Run an asyncio awaitable on the shared loop.  Returns a concurrent.futures.Future.
+    if not asyncio.iscoroutine(awaitable):
+        awaitable = _await(awaitable)
+    return asyncio.run_coroutine_threadsafe(awaitable, get_asyncio_loop())
+
+async def _await(awaitable):
+    return await awaitable
+
+def _as_future(fut):
+    # Futures and TaskHandle's are waited for as they are; asyncio awaitables are run on the loop.
+    if isinstance(fut, (concurrent.futures.Future, TaskHandle)) or not inspect.isawaitable(fut):
+        return fut, False
+    else:
+        return _run_on_asyncio_loop(fut), True
+
+
+# Concurrency policies: Which background sections run one at a time, and which run in parallel.
+PER_OBJECT = 'per-object' # One at a time for all tasks on the same wx object.  (Default.)
+PER_FUNCTION = 'per-function' # One at a time for each task method on the same wx object.
+PER_INVOCATION = 'per-invocation' # Each invocation gets a thread of its own.
+POOL = 'pool' # Each invocation runs in parallel with everything else, on a shared pool.
+_policies = (PER_OBJECT, PER_FUNCTION, PER_INVOCATION, POOL)
+
+
+_live_tasks = weakref.WeakSet() # all _TaskInProgress's not yet done, for aslong.tasks
+
+class _Current(threading.local):
+    tip = None # the _TaskInProgress running on this thread
+
+_current = _Current()
 
 
 class _TaskFunction:
-    def __init__(self, coroutine_function):
+    def __init__(self, coroutine_function, backend=None, policy=PER_OBJECT, coalesce=None,
+                 debounce_s=None, throttle_s=None, on_progress=None, progress_hz=10,
+                 priority=0):
+        if policy not in _policies:
+            raise ValueError('unknown policy %r' % (policy,))
+        if coalesce not in (None, 'latest'):
+            raise ValueError('unknown coalesce mode %r' % (coalesce,))
         self._coroutine_function = coroutine_function
+        self._backend = backend
+        self._policy = policy
+        self._coalesce = coalesce
+        self._debounce_s = debounce_s
+        self._throttle_s = throttle_s
+        self._on_progress = on_progress
+        self._progress_hz = progress_hz
+        self._priority = priority
+
+    def get_backend(self):
+        if self._backend is None:
+            return _default_backend
+        else:
+            return self._backend
 
     def call(self, wxobj, *args, **kwargs):
         """!
         @brief Invoke the long-running task.
         @param[in] wxobj	wx.EventHandler, akin to 'self' in a normal event handler.
+        @return A TaskHandle.
         """
-        evh = _TaskInProgress(self, wxobj, *args, **kwargs)
+        handle = TaskHandle(self, wxobj)
+        if self._debounce_s is None and self._throttle_s is None:
+            self.start(handle, args, kwargs)
+        else:
+            state = _get_state(wxobj, create=True)
+            try:
+                pacer = state.pacers[self]
+            except KeyError:
+                pacer = state.pacers[self] = _Pacer(self, wxobj)
+            pacer.call(handle, args, kwargs)
+        return handle
+
+    def start(self, handle, args, kwargs):
+        if handle._cancel_requested:
+            handle._set_done(cancelled=True)
+            return
+        evh = _TaskInProgress(self, handle, *args, **kwargs)
+        if self._coalesce == 'latest':
+            latest = evh._state.latest
+            previous = latest.get(self)
+            if previous is not None:
+                previous._interrupt("superseded by a newer invocation of %s" % (self,))
+            latest[self] = evh
         evh.foreground_continuation()
 
+    def __str__(self):
+        return getattr(self._coroutine_function, '__qualname__', repr(self._coroutine_function))
 
-def task(coroutine_function):
+
+def task(coroutine_function=None, *, backend=None, policy=PER_OBJECT, coalesce=None,
+         debounce_s=None, throttle_s=None, on_progress=None, progress_hz=10, priority=0):
     """!
     @brief Decorator to create long-running tasks from async methods.
     @param[in] coroutine_function	An 'async def' method.
-    @return Wrapped to act like a regular method.
+    @param[in] backend	ThreadBackend or PoolBackend to run background work on. Default set by set_default_backend.
+    @param[in] policy	PER_OBJECT, PER_FUNCTION, PER_INVOCATION or POOL.
+    @param[in] coalesce	None, or 'latest' for latest-wins: A new invocation interrupts older ones.
+    @param[in] debounce_s	Only start the task once invocations have stopped for this many seconds.
+    @param[in] throttle_s	Start the task at most once every this many seconds.
+    @param[in] on_progress	Callback(wxobj, value) for aslong.progress(value) calls from the task.
+    @param[in] progress_hz	Maximum number of on_progress calls per second.
+    @param[in] priority	Queueing priority of background and UI continuations.  Higher runs first.
+    @return Wrapped to act like a regular method, one that returns a TaskHandle.
     @detail
     The returned function looks from the caller's perspective just like a regular method, one which
     wx events can be bound to.  But within the method, 'await aslong.switch_bg()' and related can be
     used, allowing the function to do work on a background thread instead of block the UI.
+
+    Use either as '@aslong.task' or with options as '@aslong.task(policy=...)'.
+
+    The policy decides which background sections take turns running:
+    - PER_OBJECT: All tasks on the same wx object take turns.
+    - PER_FUNCTION: Invocations of this task on the same wx object take turns, but run in parallel
+      with other tasks on the same wx object.
+    - PER_INVOCATION: Every invocation runs in parallel, each on a thread of its own.
+    - POOL: Every invocation runs in parallel, on a shared pool of threads.  That's the backend
+      pool if the backend is a PoolBackend, otherwise a shared, process-wide, PoolBackend.
+
+    With coalesce='latest', invoking the task again on the same wx object interrupts the older
+    invocation, if it's still running: Its next 'await bg()' or 'await ui()' raises
+    TaskInterruptedError.  If the older invocation is still waiting for its turn on the background
+    thread, it's interrupted as soon as it gets it, without doing any more work.
+
+    With debounce_s, an invocation is postponed until no new invocations have arrived for debounce_s
+    seconds, and then only the last invocation is started.  With throttle_s, the first invocation
+    starts immediately, and invocations arriving within throttle_s of the last start are merged
+    into a single, postponed invocation with the latest arguments.  If both are given, debouncing
+    comes first.  Either way, wx.Event arguments are cloned, so that they remain valid.
+
+    The priority decides the order in which waiting background sections get to run on a shared
+    worker, and the order in which continuations queued for the UI thread are run.  Use a higher
+    priority for user-initiated tasks than for e.g. prefetching, so that they don't wait in line.
     """
-    tf = _TaskFunction(coroutine_function)
+    if coroutine_function is None:
+        return functools.partial(task, backend=backend, policy=policy, coalesce=coalesce,
+                                 debounce_s=debounce_s, throttle_s=throttle_s,
+                                 on_progress=on_progress, progress_hz=progress_hz, priority=priority)
+    tf = _TaskFunction(coroutine_function, backend=backend, policy=policy, coalesce=coalesce,
+                       debounce_s=debounce_s, throttle_s=throttle_s,
+                       on_progress=on_progress, progress_hz=progress_hz, priority=priority)
     # Can't return evh.call directly, because an bound method will not be bound again, when appearing
     # in the class dict.
     @functools.wraps(coroutine_function)
     def call(wxobj, *args, **kwargs):
         return tf.call(wxobj, *args, **kwargs)
+    call._aslong_task = tf
     return call
 
+
+def _get_task_function(task_method):
+    # Map an aslong.task-decorated function or bound method back to its _TaskFunction.
+    try:
+        return getattr(task_method, '__func__', task_method)._aslong_task
+    except AttributeError:
+        raise TypeError('%r is not an aslong.task' % (task_method,)) from None
+
 class TaskInterruptedError(InterruptedError): pass
 
 
+class TaskHandle:
+    """!
+    @brief Follows a single invocation of an aslong.task method.
+    @detail
+    Returned when calling an aslong.task method.  Only use from the UI thread, except for 'cancel',
+    which can be used from anywhere.
+    """
+    def __init__(self, task, wxobj):
+        self._task = task
+        self._wxobj = wxobj
+        self._tip = None # the _TaskInProgress, once started
+        self._cancel_requested = False
+        self._done = False
+        self._cancelled = False
+        self._result = None
+        self._exception = None
+        self._lock = threading.Lock() # for _done_callbacks, which may be added to from any thread
+        self._done_callbacks = []
+
+    def cancel(self):
+        """!
+        @brief Request that the task stop.
+        @return False if the task has already completed.
+        @detail
+        Cancelling is cooperative: TaskInterruptedError is raised at the task's next
+        'await aslong.checkpoint()', 'await aslong.bg()' or 'await aslong.ui()'.  A task that hasn't
+        started yet, because of debounce_s or throttle_s, will not be started.
+        Returns immediately, without waiting for the task to stop.
+        """
+        if self._done:
+            return False
+        self._cancel_requested = True
+        tip = self._tip
+        if tip is not None:
+            tip._interrupt("cancelled %s" % (self._task,))
+        return True
+
+    def cancelled(self):
+        """!
+        @brief True if the task ended because of TaskInterruptedError, or was never started.
+        """
+        return self._cancelled
+
+    def done(self):
+        """!
+        @brief True if the task has completed, one way or another.
+        """
+        return self._done
+
+    def result(self):
+        """!
+        @brief The value returned by the task coroutine.
+        @detail
+        Raises the task's exception if it failed, TaskInterruptedError if it was cancelled, and
+        RuntimeError if it's not done yet.  Never blocks.
+        """
+        if not self._done:
+            raise RuntimeError('task not done')
+        if self._cancelled:
+            raise TaskInterruptedError("%s was cancelled" % (self._task,))
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self):
+        """!
+        @brief The exception that the task failed with, or None.
+        """
+        if not self._done:
+            raise RuntimeError('task not done')
+        return self._exception
+
+    def add_done_callback(self, fn):
+        """!
+        @brief Call fn(handle) on the UI thread when the task is done.
+        @detail
+        If the task is already done, fn is called immediately, on the calling thread.
+        """
+        with self._lock:
+            if not self._done:
+                self._done_callbacks.append(fn)
+                return
+        fn(self)
+
+    def _set_done(self, result=None, exception=None, cancelled=False):
+        with self._lock:
+            if self._done:
+                return
+            self._result = result
+            self._exception = exception
+            self._cancelled = cancelled
+            self._tip = None
+            self._done = True
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+    def __repr__(self):
+        if not self._done:
+            status = 'running' if self._tip is not None else 'pending'
+        elif self._cancelled:
+            status = 'cancelled'
+        elif self._exception is not None:
+            status = 'failed'
+        else:
+            status = 'done'
+        return '<TaskHandle %s %s>' % (self._task, status)
+
+
+class _Pacer:
+    # Debounce/throttle timing for one _TaskFunction on one wx object.
+    # Driven by wx.CallLater timers, and so only ever used from the foreground thread.
+    # Postponed invocations are kept as (TaskHandle, args, kwargs).
+    def __init__(self, task, wxobj):
+        self._task = task
+        self._wxobj = wxobj
+        self._debounce_timer = None
+        self._debounce_pending = None
+        self._throttle_timer = None
+        self._throttle_pending = None
+        self._last_start = None # time.monotonic() of the last start
+
+    def call(self, handle, args, kwargs):
+        if self._task._debounce_s is None:
+            self._throttle(handle, args, kwargs)
+        else:
+            self._debounce_pending = _supersede(self._debounce_pending, handle, args, kwargs)
+            ms = int(self._task._debounce_s * 1000)
+            if self._debounce_timer is None:
+                self._debounce_timer = wx.CallLater(ms, self._debounce_fire)
+            else:
+                self._debounce_timer.Start(ms)
+
+    def _debounce_fire(self):
+        self._debounce_timer = None
+        handle,args,kwargs = self._debounce_pending
+        self._debounce_pending = None
+        if self._wxobj:
+            self._throttle(handle, args, kwargs)
+        else:
+            handle._set_done(cancelled=True)
+
+    def _throttle(self, handle, args, kwargs):
+        if self._task._throttle_s is None:
+            self._task.start(handle, args, kwargs)
+            return
+        now = time.monotonic()
+        if self._throttle_timer is None and (self._last_start is None or now - self._last_start >= self._task._throttle_s):
+            self._last_start = now
+            self._task.start(handle, args, kwargs)
+        else:
+            self._throttle_pending = _supersede(self._throttle_pending, handle, args, kwargs)
+            if self._throttle_timer is None:
+                ms = int(max(0, self._last_start + self._task._throttle_s - now) * 1000)
+                self._throttle_timer = wx.CallLater(ms, self._throttle_fire)
+
+    def _throttle_fire(self):
+        self._throttle_timer = None
+        handle,args,kwargs = self._throttle_pending
+        self._throttle_pending = None
+        if self._wxobj:
+            self._last_start = time.monotonic()
+            self._task.start(handle, args, kwargs)
+        else:
+            handle._set_done(cancelled=True)
+
+    def stop(self):
+        # Drop postponed invocations.
+        for timer in [self._debounce_timer, self._throttle_timer]:
+            if timer is not None:
+                timer.Stop()
+        for pending in [self._debounce_pending, self._throttle_pending]:
+            if pending is not None:
+                pending[0]._set_done(cancelled=True)
+        self._debounce_timer = self._throttle_timer = None
+        self._debounce_pending = self._throttle_pending = None
+
+
+def _supersede(pending, handle, args, kwargs):
+    # Replace a postponed invocation with a newer one.
+    if pending is not None:
+        pending[0]._set_done(cancelled=True)
+    args,kwargs = _keep_events(args, kwargs)
+    return handle,args,kwargs
+
+
+def _keep_events(args, kwargs):
+    # Clone wx.Event's that are to be used after the event handler has returned.
+    def keep(arg):
+        if isinstance(arg, wx.Event):
+            return arg.Clone()
+        else:
+            return arg
+    return [keep(a) for a in args], {k:keep(v) for k,v in kwargs.items()}
+
+
+class _WxObjectState:
+    # The aslong bookkeeping for a wx object.
+    #
+    # inbackground is the set of _TaskInProgress for which an item might potentially appear in wxq,
+    # the queue of jobs returned from the background thread to the foreground thread.
+    # (It is entirely managed from the foreground side, and so needs no locks.)
+    def __init__(self, wxobj):
+        self.wxq = wxqueue.WxQueue(wxobj, _invoke_foreground_continuation, time_budget_s=_dispatch_time_budget_s)
+        self.workers = {} # worker key => worker
+        self.inbackground = set() # set of _TaskInProgress
+        self.latest = {} # _TaskFunction => _TaskInProgress, for coalesce='latest' tasks
+        self.pacers = {} # _TaskFunction => _Pacer, for debounce_s/throttle_s tasks
+        self.progress_channels = {} # _TaskFunction or other key => ProgressChannel
+        self.shut_down = False # True once cleanup has started
+        self.groups = set() # TaskGroup's with children on this wx object, while active
+
+
+_states = weakref.WeakKeyDictionary() # wx object => _WxObjectState
+
+def _get_state(wxobj, create=False):
+    # The _WxObjectState of a wx object, or None if it never ran a task.
+    # States are released when the window is destroyed: The state refers to the tasks in progress,
+    # and they refer to the wx object, so the weak key alone doesn't release it.
+    state = _states.get(wxobj)
+    if state is None and create:
+        state = _states[wxobj] = _WxObjectState(wxobj)
+        if isinstance(wxobj, wx.Window):
+            wxobj.Bind(wx.EVT_WINDOW_DESTROY, functools.partial(_on_window_destroy, weakref.ref(wxobj)))
+    return state
+
+def _on_window_destroy(wxobj_ref, event):
+    event.Skip()
+    wxobj = wxobj_ref()
+    if wxobj is not None and event.GetEventObject() is wxobj:
+        _release(wxobj)
+
+def _release(wxobj):
+    # The wx object is going away: Close its workers, and close the coroutines of tasks still in
+    # progress, to release their frames.  Tasks detached by cleanup_nowait are left to finish.
+    state = _states.pop(wxobj, None)
+    if state is None:
+        return
+    if state.shut_down:
+        if len(state.inbackground) == 0:
+            for worker in state.workers.values():
+                worker.close()
+        return
+    wxq = state.wxq
+    wxq.Unbind()
+    for pacer in state.pacers.values():
+        pacer.stop()
+    for channel in state.progress_channels.values():
+        channel.close()
+    for group in list(state.groups):
+        group._owner_destroyed()
+    for tip in list(_live_tasks):
+        if tip._wxobj is wxobj:
+            tip._abandon()
+    # From here on, nothing more is posted to wxq or the workers, so draining and closing is final.
+    while 1:
+        try:
+            continuation = wxq.get_nowait()
+        except queue.Empty:
+            break
+        tip = getattr(continuation, '__self__', None)
+        if isinstance(tip, _TaskInProgress):
+            tip._close_abandoned()
+    for worker in state.workers.values():
+        worker.close()
+    state.workers.clear()
+    state.latest.clear()
+    state.inbackground.clear()
+
+
 class _TaskInProgress:
-    def __init__(self, task, wxobj, *args, **kwargs):
+    def __init__(self, task, handle, *args, **kwargs):
+        wxobj = handle._wxobj
         self._task = task
         self._wxobj = wxobj
-        self._wxq, self._worker,self._inbackground = self._get_worker(wxobj)
+        self._handle = handle
+        handle._tip = self
+        self._own_worker = False # True if self._worker is private to this invocation
+        self._state = _get_state(wxobj, create=True)
+        self._wxq = self._state.wxq
+        self._inbackground = self._state.inbackground
+        self._worker = self._get_worker()
         self._coroutine = task._coroutine_function(wxobj, *args, **kwargs)
         self._reply = None
         self._exc_info = None
-        self._shutting_down = False # only accessed from foreground thread
-
-    def _get_worker(self, wxobj):
-        # Current implementation shares a worker thread among all event handlers on the same wx.Window.
-        # One might change this to store something on self._task that says what
-        # to do instead. E.g. using a shared thread from a global pool, or using a unique thread for
-        # the particular _TaskFunction. (With still only one WxQueue, might be doable.)
-        #
-        # inbackground is the set of _TaskInProgress for which an item might potentially appear in wxq,
-        # the queue of jobs returned from the background thread to the foreground thread.
-        # (It is entirely managed from the foreground side, and so needs no locks.)
+        self._shutting_down = False # set on the foreground thread
+        self._shutdown_message = None
+        # Set by _interrupt, to have TaskInterruptedError raised at the next switch.
+        self._interrupt_message = None
+        self._interrupt_delivered = False
+        self._result = None # coroutine return value, if it ended on the background thread
+        self._waiting = None # the _Wait, while waiting for futures
+        self._posted_at = None # time.perf_counter() when the next continuation was posted, if tracing
+        self._wxobj_name = None # for tracing, fetched on the UI thread
+        # For aslong.tasks: Where the task is, 'ui', 'bg', 'queued' or 'waiting', and since when.
+        self._started = self._since = time.monotonic()
+        self._where = 'ui'
+        _live_tasks.add(self)
+        # Set when the wx object is destroyed without cleanup.  The coroutine is then closed
+        # instead of continued, the next time it's about to switch.
+        self._abandoned = False
+        self._closed = False
+        # Makes checking _abandoned and posting a continuation atomic with respect to _abandon, so
+        # that nothing is posted to the queue or worker after _release has drained or closed it.
+        self._post_lock = threading.Lock()
+
+    def _get_worker(self):
+        # Under the PER_OBJECT policy, all event handlers on the same wx.Window that use the same
+        # backend share a worker: Either a dedicated worker thread, or a PoolWorker on a shared pool.
+        # PER_FUNCTION keys the worker by _TaskFunction as well, and PER_INVOCATION/POOL workers
+        # are private to the _TaskInProgress, and are closed when it's done.
+        backend = self._task.get_backend()
+        policy = self._task._policy
+        if policy == PER_INVOCATION:
+            self._own_worker = True
+            if isinstance(backend, ThreadBackend):
+                return backend.new_worker() # with the backend's WorkerThread options
+            return workerthread.WorkerThread()
+        elif policy == POOL:
+            self._own_worker = True
+            return _get_pool_backend(backend).new_worker()
+        elif policy == PER_FUNCTION:
+            key = (backend, self._task)
+        else:
+            key = backend
+        workers = self._state.workers
         try:
-            wxq,worker,inbackground = wxobj.__aslong_backend
-        except AttributeError:
-            wxq = wxqueue.WxQueue(wxobj, _invoke_foreground_continuation)
-            worker = workerthread.WorkerThread()
-            inbackground = set() # set of _TaskInProgress
-            wxobj.__aslong_backend = wxq,worker,inbackground
-        return wxq,worker,inbackground
+            return workers[key]
+        except KeyError:
+            worker = workers[key] = backend.new_worker()
+            return worker
+
+    def _interrupt(self, message):
+        # Request TaskInterruptedError raised at the next 'await bg()' or 'await ui()'.
+        # Can be called from any thread.
+        if self._interrupt_message is None:
+            self._interrupt_message = message
+        waiting = self._waiting
+        if waiting is not None and not self._interrupt_delivered:
+            waiting.fire() # stop waiting, so the interrupt is delivered promptly
+
+    def _wait(self, waiting, wake):
+        # Suspend the coroutine until the _Wait is over, then wake() to resume.
+        self._waiting = waiting
+        self._where, self._since = 'waiting', time.monotonic()
+        waiting.start(wake)
+
+    def _take_reply(self):
+        # The value and exception to resume the coroutine with when entering a continuation.
+        waiting = self._waiting
+        if waiting is None:
+            return self._reply, None
+        else:
+            self._waiting = None
+            return waiting.outcome()
+
+    def _resume(self, reply, at_switch, reply_exc=None):
+        # Continue running the coroutine.  At a bg/ui switch point, deliver any pending interrupt.
+        if at_switch and self._interrupt_message is not None and not self._interrupt_delivered:
+            self._interrupt_delivered = True
+            return self._coroutine.throw(TaskInterruptedError(self._interrupt_message))
+        elif reply_exc is not None:
+            return self._coroutine.throw(reply_exc)
+        else:
+            return self._coroutine.send(reply)
+
+    def _post_foreground_continuation(self):
+        self._where, self._since = 'queued', time.monotonic()
+        if _tracer is not None:
+            self._posted_at = time.perf_counter()
+        self._post_ui(self.foreground_continuation)
+
+    def _post_ui(self, continuation):
+        with self._post_lock:
+            if not self._abandoned:
+                self._wxq.put(continuation, priority=self._task._priority)
+                return
+        self._close_abandoned()
+
+    def _post_background_continuation(self):
+        with self._post_lock:
+            if not self._abandoned:
+                self._where, self._since = 'queued', time.monotonic()
+                if _tracer is not None:
+                    self._posted_at = time.perf_counter()
+                self._worker.job(self.background_continuation, priority=self._task._priority)
+                return
+        self._close_abandoned()
+
+    def _trace(self, tracer, side, queued, started):
+        # Report a section that has just ended.  By now self._posted_at may be the posting time of
+        # the next section, so the caller reads 'queued' when the section starts.
+        if self._wxobj_name is None and side == 'ui' and self._wxobj:
+            self._wxobj_name = self._wxobj.GetName()
+        tracer(tasktrace.Section(str(self._task), self._wxobj_name, side, threading.get_ident(),
+                                 queued, started, time.perf_counter()))
+
+    def _interrupt_swallowed(self, exc):
+        # True if exc is the TaskInterruptedError injected by _resume, propagated all the way out.
+        return self._interrupt_delivered and isinstance(exc, TaskInterruptedError)
 
     def foreground_continuation(self):
+        if self._abandoned:
+            return self._close_abandoned()
+        previous, _current.tip = _current.tip, self
+        self._where, self._since = 'ui', time.monotonic()
+        tracer = _tracer
+        if tracer is not None:
+            queued, started = self._posted_at, time.perf_counter()
+        try:
+            self._foreground_continuation()
+        finally:
+            _current.tip = previous
+            if tracer is not None:
+                self._trace(tracer, 'ui', queued, started)
+
+    def _foreground_continuation(self):
         self._inbackground.discard(self)
         if self._shutting_down:
             return self._shutdown_foreground_continuation()
         else:
-            reply = self._reply
+            reply,reply_exc = self._take_reply()
+            at_switch = True
             while 1:
                 try:
-                    request = self._coroutine.send(reply)
-                except StopIteration:
+                    request = self._resume(reply, at_switch, reply_exc)
+                except StopIteration as exc:
+                    self._done(result=exc.value)
                     break
+                except BaseException as exc:
+                    if self._interrupt_swallowed(exc):
+                        self._done(cancelled=True)
+                        break
+                    self._done(exception=exc)
+                    raise
+                reply_exc = None
 
                 if request == 'bg':
                     self._reply = None
                     self._inbackground.add(self)
-                    self._worker.job(self.background_continuation)
+                    self._post_background_continuation()
                     break
-                elif request == 'ui':
+                elif isinstance(request, _Wait):
+                    self._reply = None
+                    self._inbackground.add(self)
+                    self._wait(request, self._post_foreground_continuation)
+                    break
+                elif request in ('ui', '!'):
                     reply = None
+                    at_switch = True
                 elif request == '?':
                     reply = True
+                    at_switch = False
                 else:
-                    raise NotImplementedError(repr(request))
+                    raise _unsupported_request(request)
 
     def background_continuation(self):
-        reply = self._reply
+        if self._abandoned:
+            return self._close_abandoned()
+        previous, _current.tip = _current.tip, self
+        self._where, self._since = 'bg', time.monotonic()
+        tracer = _tracer
+        if tracer is not None:
+            queued, started = self._posted_at, time.perf_counter()
+        try:
+            self._background_continuation()
+        finally:
+            _current.tip = previous
+            if tracer is not None:
+                self._trace(tracer, 'bg', queued, started)
+
+    def _background_continuation(self):
+        reply,reply_exc = self._take_reply()
+        at_switch = True
         while 1:
             try:
-                request = self._coroutine.send(reply)
-            except StopIteration:
-                self._wxq.put(self.finished_continuation)
+                request = self._resume(reply, at_switch, reply_exc)
+            except StopIteration as exc:
+                self._result = exc.value
+                self._post_ui(self.finished_continuation)
                 break
-            except:
-                self._exc_info = sys.exc_info()
-                self._wxq.put(self.exception_continuation)
+            except BaseException as exc:
+                if self._interrupt_swallowed(exc):
+                    self._post_ui(self.interrupted_continuation)
+                else:
+                    self._exc_info = sys.exc_info()
+                    self._post_ui(self.exception_continuation)
                 break
+            reply_exc = None
             if request == 'ui':
                 self._reply = None
-                self._wxq.put(self.foreground_continuation)
+                self._post_foreground_continuation()
                 break
-            elif request == 'bg':
+            elif isinstance(request, _Wait):
+                self._reply = None
+                self._wait(request, self._post_background_continuation)
+                break
+            elif request in ('bg', '!'):
                 reply = None
+                at_switch = True
             elif request == '?':
                 reply = False
+                at_switch = False
             else:
-                raise NotImplementedError(repr(request))
+                raise _unsupported_request(request)
 
     def exception_continuation(self):
         self._inbackground.discard(self)
         _exc_cls, exc, tb = self._exc_info
+        self._done(exception=exc)
         raise exc.with_traceback(tb)
 
     def finished_continuation(self):
         self._inbackground.discard(self)
-    
+        self._done(result=self._result)
+
+    def interrupted_continuation(self):
+        self._inbackground.discard(self)
+        self._done(cancelled=True)
+
+    def _done(self, result=None, exception=None, cancelled=False):
+        # The coroutine has run to completion, one way or another.
+        if self._own_worker:
+            self._worker.close()
+        if self._state.latest.get(self._task) is self:
+            del self._state.latest[self._task]
+        _live_tasks.discard(self)
+        self._handle._set_done(result=result, exception=exception, cancelled=cancelled)
+
+    def progress(self, value):
+        tf = self._task
+        if tf._on_progress is None:
+            raise RuntimeError('%s has no on_progress callback' % (tf,))
+        channels = self._state.progress_channels
+        try:
+            channel = channels[tf]
+        except KeyError:
+            # Created on the first call, which may be on a background thread.  Should two threads
+            # race to create it, setdefault makes sure they end up using the same one.
+            channel = channels.setdefault(tf, ProgressChannel(self._wxobj, tf._on_progress, tf._progress_hz))
+        channel.put(value)
+
+    def _abandon(self):
+        # The wx object has been destroyed.  Called on the UI thread, while the coroutine is not
+        # running on the UI thread, but it may be running on a background thread.
+        with self._post_lock:
+            self._abandoned = True
+        waiting = self._waiting
+        if waiting is not None:
+            waiting.fire() # the wake-up closes the coroutine
+
+    def _close_abandoned(self):
+        # Release the coroutine frame, running its finally clauses on the current thread.
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._coroutine.close()
+        except RuntimeError:
+            logger.warning('%s: abandoned task awaited while being closed', self._task, exc_info=True)
+        if self._own_worker:
+            self._worker.close()
+        _live_tasks.discard(self)
+        if wx.IsMainThread():
+            self._handle._set_done(cancelled=True)
+        else:
+            wx.CallAfter(self._handle._set_done, cancelled=True)
+
     def _set_as_shutting_down(self):
+        # The message is made now, while the wx object still exists.
+        self._shutdown_message = "destroying wx object '%s'" % (self._wxobj.Name,)
         self._shutting_down = True
-                
+        waiting = self._waiting
+        if waiting is not None:
+            # Waiting in a background section, the wake-up resumes the coroutine on a background
+            # thread, so it gets TaskInterruptedError there, like from _interrupt.
+            if self._interrupt_message is None:
+                self._interrupt_message = self._shutdown_message
+            waiting.fire()
+
     def _shutdown_foreground_continuation(self):
-        inject_exception = TaskInterruptedError("destroying wx object '%s'" % (self._wxobj.Name,))
+        inject_exception = TaskInterruptedError(self._shutdown_message)
+        self._waiting = None
         reply = self._reply
         while 1:
             try:
@@ -131,50 +895,612 @@ class _TaskInProgress:
                     request = self._coroutine.throw(inject_exception)
                 else:
                     request = self._coroutine.send(reply)
-            except (StopIteration, TaskInterruptedError):
+            except StopIteration as exc:
+                self._done(result=exc.value)
+                break
+            except TaskInterruptedError:
+                self._done(cancelled=True)
                 break
+            except BaseException as exc:
+                self._done(exception=exc)
+                raise
             else:
                 if request == '?':
                     reply = True
                 else:
                     reply = None
 
+
+def _unsupported_request(request):
+    if asyncio.isfuture(request):
+        return NotImplementedError('%r: use aslong.aio to await asyncio awaitables' % (request,))
+    return NotImplementedError(repr(request))
+
+
+class _Wait:
+    # Yielded to the _TaskInProgress event loop to wait for futures: concurrent.futures.Future's
+    # and TaskHandle's.  Calls wake() exactly once, from whatever thread, when the wait is over.
+    def __init__(self, futures, return_when, gather):
+        self._futures = futures
+        self._return_when = return_when
+        self._gather = gather # True: outcome is a list of results, False: (done, not_done)
+        self._lock = threading.Lock()
+        self._remaining = len(futures)
+        self._fired = False
+        self._wake = None
+
+    def start(self, wake):
+        with self._lock:
+            self._wake = wake
+            fired = self._fired
+        if fired:
+            wake()
+        elif len(self._futures) == 0:
+            self.fire()
+        else:
+            for fut in self._futures:
+                fut.add_done_callback(self._one_done)
+
+    def _one_done(self, fut):
+        with self._lock:
+            self._remaining -= 1
+            ready = (self._remaining == 0
+                     or self._return_when == FIRST_COMPLETED
+                     or (self._return_when == FIRST_EXCEPTION and _failed(fut)))
+        if ready:
+            self.fire()
+
+    def fire(self):
+        with self._lock:
+            if self._fired:
+                return
+            self._fired = True
+            wake = self._wake
+        if wake is not None:
+            wake()
+
+    def outcome(self):
+        # (reply, reply_exc) for resuming the coroutine.
+        done = set(fut for fut in self._futures if fut.done())
+        if not self._gather:
+            return (done, set(self._futures) - done), None
+        elif len(done) < len(self._futures):
+            # Woken early.  A pending interrupt takes precedence over this, see _resume.
+            return None, TaskInterruptedError('wait interrupted with %d of %d futures done' % (
+                len(done), len(self._futures)))
+        else:
+            for fut in self._futures:
+                if _failed(fut):
+                    try:
+                        fut.result()
+                    except BaseException as exc:
+                        return None, exc
+            return [fut.result() for fut in self._futures], None
+
+
+def _failed(fut):
+    # True if a done future or TaskHandle failed or was cancelled.
+    return fut.cancelled() or fut.exception() is not None
+
+
+class ProgressChannel:
+    """!
+    @brief Latest-value-wins channel for reporting progress from any thread to the UI.
+    @detail
+    'put' never blocks and never waits for the UI.  The UI side calls the callback with the most
+    recent value, at most max_hz times per second; values put in between are skipped.
+    """
+    def __init__(self, wxobj, callback, max_hz=10):
+        """!
+        @param[in] wxobj	The wx object to deliver progress to.  Shares the aslong WxQueue.
+        @param[in] callback	Called as callback(wxobj, value) on the UI thread.
+        @param[in] max_hz	Maximum number of callbacks per second.
+        """
+        self._wxobj = wxobj
+        self._callback = callback
+        self._interval_s = 1.0 / max_hz
+        self._wxq = _get_state(wxobj, create=True).wxq
+        self._lock = threading.Lock()
+        self._value = None
+        self._pending = False # True while a value is waiting to be delivered
+        self._last_delivery = None # time.monotonic() of the last callback
+        self._closed = False # only accessed from foreground thread
+
+    def put(self, value):
+        """!
+        @brief Report a progress value.  Can be called from any thread.
+        """
+        with self._lock:
+            self._value = value
+            if self._pending:
+                return
+            self._pending = True
+        self._wxq.put(self._deliver)
+
+    def _deliver(self):
+        if self._closed or not self._wxobj:
+            return
+        now = time.monotonic()
+        if self._last_delivery is not None and now - self._last_delivery < self._interval_s:
+            wx.CallLater(int((self._last_delivery + self._interval_s - now) * 1000) + 1, self._deliver)
+            return
+        with self._lock:
+            value = self._value
+            self._value = None
+            self._pending = False
+        self._last_delivery = now
+        self._callback(self._wxobj, value)
+
+    def close(self):
+        """!
+        @brief Drop undelivered values, and don't deliver any more.
+        """
+        self._closed = True
+
+
+def _get_pool_backend(backend):
+    # The pool used by the POOL policy.
+    global _shared_pool_backend
+    if isinstance(backend, PoolBackend):
+        return backend
+    with _shared_pool_backend_lock: # may be called from any thread
+        if _shared_pool_backend is None:
+            _shared_pool_backend = PoolBackend()
+        return _shared_pool_backend
+
 def _invoke_foreground_continuation(wxevthandler, foreground_continuation_bound_method):
     foreground_continuation_bound_method()
 
-def cleanup(wxobj):
+def cleanup(wxobj, timeout_s=None, on_timeout=None):
     """!
-    @brief 
+    @brief Run the tasks still in progress on a wx object to completion, before it's destroyed.
+    @param[in] wxobj	The wx.EvtHandler that the tasks are associated with.
+    @param[in] timeout_s	Maximum time to wait for background sections to finish.  None means
+				wait as long as it takes.
+    @param[in] on_timeout	Called as on_timeout(stragglers), with a list of the TaskHandle's of the
+				tasks still in a background section when the time ran out.  If None,
+				they're logged as a warning.
+    @detail
+    Tasks are interrupted with TaskInterruptedError at their next switch to the UI thread, and
+    the UI thread waits for that to happen.  Tasks still in the background after timeout_s are
+    detached from wxobj: They are finished later, by the wx event loop, in the same way.
     """
-    try:
-        wxq,worker,inbackground = wxobj._TaskInProgress__aslong_backend
-    except AttributeError:
-        pass
-    else:
-        # Decouple the event that executes foreground work, and instead, pull the remaining
-        # continuations, posted by the background tasks, directly from the queue.Queue interface.
-        wxq.Unbind() # decouple
-        for eip in inbackground:
-            eip._set_as_shutting_down()
+    state = _get_state(wxobj)
+    if state is not None:
+        wxq,inbackground = _shut_down(state)
+        if timeout_s is not None:
+            deadline = time.monotonic() + timeout_s
         while len(inbackground) > 0:
-            continuation = wxq.get() # queue.Queue.get
+            if timeout_s is None:
+                continuation = wxq.get() # queue.Queue.get
+            else:
+                try:
+                    continuation = wxq.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    stragglers = [tip._handle for tip in inbackground]
+                    _detach(state)
+                    if on_timeout is not None:
+                        on_timeout(stragglers)
+                    else:
+                        logger.warning('aslong.cleanup timed out after %s s, detached: %s',
+                                       timeout_s, ', '.join(map(repr, stragglers)))
+                    return
+            continuation()
+
+
+def cleanup_nowait(wxobj, on_done=None):
+    """!
+    @brief Like cleanup, but return right away, and let the tasks finish in the background.
+    @param[in] wxobj	The wx.EvtHandler that the tasks are associated with.
+    @param[in] on_done	Called without arguments on the UI thread when the last task is finished.
+    @detail
+    The tasks are interrupted and finished, as with cleanup, by the wx event loop, not on wxobj,
+    so wxobj can be destroyed straight away.
+    """
+    state = _get_state(wxobj)
+    if state is not None:
+        wxq,inbackground = _shut_down(state)
+        if len(inbackground) > 0:
+            _detach(state, on_done)
+            return
+    if on_done is not None:
+        on_done()
+
+
+def _shut_down(state):
+    # Stop tasks on a wx object from doing any more, and mark them for interruption.
+    # Decouple the event that executes foreground work, and instead, pull the remaining
+    # continuations, posted by the background tasks, directly from the queue.Queue interface.
+    wxq,inbackground = state.wxq,state.inbackground
+    state.shut_down = True
+    wxq.Unbind() # decouple
+    for pacer in state.pacers.values():
+        pacer.stop()
+    for channel in state.progress_channels.values():
+        channel.close()
+    for eip in inbackground:
+        eip._set_as_shutting_down()
+    return wxq,inbackground
+
+
+_detached = set() # hidden wx.EvtHandler's for continuations of tasks on cleaned-up wx objects
+
+def _detach(state, on_done=None):
+    # Run the rest of the continuations of the tasks in state.inbackground from the wx event loop,
+    # on a hidden wx.EvtHandler, which is kept alive until the last task is finished.  Then close
+    # the workers, as nothing more runs on them.
+    wxq,inbackground = state.wxq,state.inbackground
+    evthandler = wx.EvtHandler()
+    _detached.add(evthandler)
+    def run_continuation(evthandler, continuation):
+        try:
             continuation()
+        finally:
+            if len(inbackground) == 0 and evthandler in _detached:
+                _detached.discard(evthandler)
+                wxq.Unbind()
+                for worker in state.workers.values():
+                    worker.close()
+                if on_done is not None:
+                    on_done()
+    wxq.BindReceiveItem(evthandler, run_continuation)
 
 
-def busy(wxobj):
+def busy(wxobj, task=None):
     """!
     @brief Check for background tasks in progress.
     @param[in] wxobj	The wx.EvtHandler that the tasks are associated with.
+    @param[in] task	Optional aslong.task method, e.g. self.OnExport, to only check for that task.
     @return True if busy.
     @detail
     If called from a task in ui mode, the callee does not count as busy.
+    All tasks on the wx object count, whatever their policy.  Pass 'task' to check on a single
+    task, e.g. if it uses the PER_FUNCTION policy, to see whether starting it again means waiting.
     """
-    try:
-        wxq,worker,inbackground = wxobj._TaskInProgress__aslong_backend
-    except AttributeError:
+    state = _get_state(wxobj)
+    if state is None:
         return False
+    elif task is None:
+        return len(state.inbackground) > 0
     else:
-        return len(inbackground) > 0
+        tf = _get_task_function(task)
+        return any(tip._task is tf for tip in state.inbackground)
+
+
+def queue_stats(wxobj):
+    """!
+    @brief Statistics for the queue of UI-side continuations of a wx object.
+    @param[in] wxobj	The wx.EvtHandler that the tasks are associated with.
+    @return The wxqueue.WxQueue.GetStats dict, or None if the wx object never ran a task.
+    @detail
+    Use it to tune aslong.set_dispatch_time_budget: The latencies show how long continuations
+    wait for the UI thread, and reposts how often the time budget ran out.
+    """
+    state = _get_state(wxobj)
+    if state is None:
+        return None
+    return state.wxq.GetStats()
+
+
+class TaskInfo(collections.namedtuple('TaskInfo', 'name owner state started time_in_state_s handle')):
+    """!
+    @brief Snapshot of a task in progress, as returned by aslong.tasks.
+    @detail
+    name		Name of the task function.
+    owner		The wx object the task runs on.  Only use it from the UI thread.
+    state		'ui' or 'bg': Running on that side.  'queued': Waiting for its turn to run.
+			'waiting': Waiting for futures, as in aslong.gather or aslong.cpu.
+    started		time.monotonic() when the task started.
+    time_in_state_s	Time spent in the current state.
+    handle		The TaskHandle.
+    """
+    __slots__ = ()
+
+
+def tasks():
+    """!
+    @brief All tasks in progress, in the whole process.
+    @return A list of TaskInfo's, oldest first.
+    @detail
+    Can be called from any thread.  The states are read without locking, so a task that is
+    switching at the time may be reported as being in either state.
+    """
+    while 1:
+        try:
+            live = list(_live_tasks)
+            break
+        except RuntimeError: # set changed size during iteration, on another thread
+            pass
+    now = time.monotonic()
+    infos = []
+    for tip in live:
+        where, since = tip._where, tip._since
+        infos.append(TaskInfo(str(tip._task), tip._wxobj, where, tip._started, now - since, tip._handle))
+    infos.sort(key=lambda info: info.started)
+    return infos
+
+
+def snapshot():
+    """!
+    @brief A description of all tasks in progress, for logging or a diagnostics window.
+    @return A multi-line string: A line per task, and a summary line.
+    @detail
+    Can be called from any thread.
+    """
+    infos = tasks()
+    now = time.monotonic()
+    lines = []
+    for info in infos:
+        lines.append('%-40s %-7s for %8.3f s, started %8.3f s ago, on %s at 0x%x' % (
+            info.name, info.state, info.time_in_state_s, now - info.started,
+            type(info.owner).__name__, id(info.owner)))
+    counts = collections.Counter(info.state for info in infos)
+    lines.append('%d tasks in progress: %s' % (
+        len(infos), ', '.join('%d %s' % (counts[state], state) for state in ('ui', 'bg', 'queued', 'waiting'))))
+    return '\n'.join(lines)
+
+
+def spawn(func, *args, **kwargs):
+    """!
+    @brief Start func(*args, **kwargs) running on a shared pool of threads.
+    @return A concurrent.futures.Future.
+    @detail
+    Can be called from anywhere.  Use 'await aslong.gather(...)' or 'await aslong.wait(...)' to
+    wait for the result from inside a task.  The pool is that of the default backend, if it's a
+    PoolBackend, otherwise the shared pool used by the POOL policy.
+    """
+    future = concurrent.futures.Future()
+    def job():
+        if future.set_running_or_notify_cancel():
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+    _get_pool_backend(_default_backend).pool.job(job)
+    return future
+
+
+async def cpu(func, *args, **kwargs):
+    """!
+    @brief Run func(*args, **kwargs) in a separate process, and return the result.
+    @detail
+    For CPU-bound work: A background section runs on a thread, which competes with the UI thread
+    for the GIL, whereas a process doesn't.  func, the arguments and the result must be picklable,
+    so func must be a module-level function.  The task is suspended, without blocking a thread,
+    and continues on the same thread it was on, UI or background.  If the task is cancelled while
+    waiting, the call is cancelled if it hasn't started yet; otherwise the result is dropped.
+    See set_cpu_pool for configuring the process pool.
+    """
+    future = _get_cpu_pool().submit(func, *args, **kwargs)
+    try:
+        results = await _event_loop(_Wait([future], ALL_COMPLETED, gather=True))
+    finally:
+        if not future.done():
+            future.cancel()
+    return results[0]
+
+
+async def gather(*futures):
+    """!
+    @brief Wait for all of a number of futures.
+    @param[in] futures	concurrent.futures.Future's (e.g. from aslong.spawn), TaskHandle's and
+			asyncio awaitables, which are run as with aslong.aio.
+    @return A list of their results, in order.
+    @detail
+    The task continues on the same thread it was on, UI or background, once all are done.  If any
+    failed, then the exception of the first one that failed, in argument order, is raised.
+    """
+    return await _wait_for(futures, ALL_COMPLETED, gather=True)
+
+
+async def wait(futures, return_when=ALL_COMPLETED):
+    """!
+    @brief Wait for futures, like concurrent.futures.wait, but without blocking a thread.
+    @param[in] futures	concurrent.futures.Future's (e.g. from aslong.spawn) and TaskHandle's.
+			asyncio awaitables are run as with aslong.aio, and appear in the result
+			as the concurrent.futures.Future's running them.
+    @param[in] return_when	ALL_COMPLETED, FIRST_COMPLETED or FIRST_EXCEPTION.
+    @return (done, not_done), two sets.
+    @detail
+    The task continues on the same thread it was on, UI or background.
+    """
+    return await _wait_for(futures, return_when, gather=False)
+
+
+async def _wait_for(futures, return_when, gather):
+    # Wait for futures, running any asyncio awaitables among them on the asyncio loop first.
+    # Those are cancelled if the wait ends with an exception, e.g. when the task is cancelled.
+    futures = list(futures)
+    started = []
+    for i,fut in enumerate(futures):
+        futures[i], ours = _as_future(fut)
+        if ours:
+            started.append(futures[i])
+    try:
+        return await _event_loop(_Wait(futures, return_when, gather=gather))
+    except BaseException:
+        for fut in started:
+            fut.cancel()
+        raise
+
+
+async def aio(awaitable):
+    """!
+    @brief Await an asyncio awaitable, e.g. a coroutine from an asyncio-based library.
+    @return The result of awaiting it.
+    @detail
+    The awaitable runs on the asyncio event loop, see get_asyncio_loop, while the task is
+    suspended without blocking a thread.  The task then continues on the same thread it was on,
+    UI or background.  If the task is cancelled while waiting, the awaitable is cancelled.
+    To have many in flight at once, pass them to aslong.gather or aslong.wait instead.
+    """
+    return (await _wait_for([awaitable], ALL_COMPLETED, gather=True))[0]
+
+
+class TaskGroup:
+    """!
+    @brief Run a number of child tasks in parallel, and wait for all of them.
+    @detail
+    Use from inside an aslong task:
+
+        async with aslong.TaskGroup(self) as g:
+            g.start(fetch_page, url1)
+            g.start(fetch_page, url2)
+            g.spawn(blocking_function, arg)
+        # All children are done here.
+
+    Leaving the 'async with' block waits for all children.  If a child fails, the other children
+    are cancelled, and once they're all done, the exception of the first child that failed is
+    raised.  If the block itself fails, or the waiting task is cancelled, all children are
+    cancelled.  When the owner is destroyed, the children are closed and the group raises
+    TaskInterruptedError.  Children that are cancelled don't affect their siblings.  When the task
+    using the group is cleaned up, it stops waiting for the children, which are left cancelled.
+    """
+    def __init__(self, owner):
+        """!
+        @param[in] owner	The wx object that child tasks run on.  Need not be the wx object of the
+				task using the group.
+        """
+        self._owner = owner
+        self._children = [] # TaskHandle's and concurrent.futures.Future's
+        self._state = None
+        self._active = False
+        self._destroyed = False
+
+    async def __aenter__(self):
+        if _current.tip is None:
+            raise RuntimeError('aslong.TaskGroup used outside an aslong.task')
+        self._state = _get_state(self._owner, create=True)
+        self._state.groups.add(self)
+        self._active = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.cancel()
+        tip = _current.tip
+        failure = interrupted = None
+        try:
+            while 1:
+                if tip._shutting_down:
+                    # cleanup is waiting for the task: Don't wait for the children as well.  Had the
+                    # task already been interrupted, the wake-up from cleanup raised nothing.
+                    self.cancel()
+                    raise TaskInterruptedError(tip._shutdown_message)
+                pending = [child for child in self._children if not child.done()]
+                if len(pending) == 0:
+                    break
+                try:
+                    await wait(pending, FIRST_EXCEPTION)
+                except TaskInterruptedError as e:
+                    if interrupted is not None:
+                        raise # interrupted again, e.g. by cleanup: Stop waiting.
+                    interrupted = e
+                    self.cancel()
+                    continue
+                if failure is None:
+                    failure = self._first_failure()
+                    if failure is not None:
+                        self.cancel()
+        finally:
+            self._active = False
+            self._state.groups.discard(self)
+        if exc is not None:
+            return False
+        elif interrupted is not None:
+            raise interrupted
+        elif failure is not None:
+            raise failure
+        elif self._destroyed:
+            raise TaskInterruptedError("destroyed wx object of %r" % (self,))
+
+    def start(self, coroutine_function, *args, **kwargs):
+        """!
+        @brief Start a child task: coroutine_function(owner, *args, **kwargs).
+        @param[in] coroutine_function	An async function, or an aslong.task function.
+        @return A TaskHandle.
+        @detail
+        A plain async function runs with the POOL policy, so children run in parallel.  An
+        aslong.task runs with its own options.  Can be called from either thread: On a
+        background thread, the child is started on the UI thread shortly after.
+        """
+        self._check_active()
+        try:
+            tf = _get_task_function(coroutine_function)
+        except TypeError:
+            tf = _TaskFunction(coroutine_function, policy=POOL)
+        if wx.IsMainThread():
+            handle = tf.call(self._owner, *args, **kwargs)
+        else:
+            handle = TaskHandle(tf, self._owner)
+            wx.CallAfter(tf.start, handle, args, kwargs)
+        self._children.append(handle)
+        return handle
+
+    def spawn(self, func, *args, **kwargs):
+        """!
+        @brief Start func(*args, **kwargs) on the shared pool, as with aslong.spawn.
+        @return A concurrent.futures.Future.
+        """
+        self._check_active()
+        future = spawn(func, *args, **kwargs)
+        self._children.append(future)
+        return future
+
+    def cancel(self):
+        """!
+        @brief Cancel all children.
+        @detail
+        Futures from 'spawn' can only be cancelled if they haven't started running yet.
+        """
+        for child in list(self._children):
+            child.cancel()
+
+    def _check_active(self):
+        if self._destroyed:
+            raise TaskInterruptedError("destroyed wx object of %r" % (self,))
+        if not self._active:
+            raise RuntimeError('TaskGroup not active: use "async with"')
+
+    def _first_failure(self):
+        for child in self._children:
+            if child.done() and not child.cancelled() and child.exception() is not None:
+                return child.exception()
+        return None
+
+    def _owner_destroyed(self):
+        # The owner is being destroyed.  Its tasks are closed separately, by _release.
+        self._destroyed = True
+        self.cancel()
+
+    def __repr__(self):
+        return '<TaskGroup of %s with %d children>' % (type(self._owner).__name__, len(self._children))
+
+
+def progress(value):
+    """!
+    @brief Report progress from a task to its on_progress callback.
+    @param[in] value	Passed to on_progress.  Any type.
+    @detail
+    Does not switch threads: Call it as often as you like from a background loop.  The UI
+    receives the most recent value, at most progress_hz times per second.
+    """
+    tip = _current.tip
+    if tip is None:
+        raise RuntimeError('aslong.progress called outside an aslong.task')
+    tip.progress(value)
+
+
+async def checkpoint():
+    """!
+    @brief Raise TaskInterruptedError if the task has been cancelled.
+    @detail
+    Use in long-running loops, on either thread, to make them stop promptly when cancelled
+    through TaskHandle.cancel, or interrupted by a newer invocation with coalesce='latest'.
+    """
+    await _event_loop('!')
 
 
 async def is_ui():
@@ -1,7 +1,7 @@
 """List control that allows for arbitrary wxPython things as list elements."""
-import sys, os.path, struct, re, itertools, io, binascii, time
+import sys, os.path, struct, re, itertools, io, binascii, time, contextlib
 import wx
-from .sizers import SetSizerNaturalTabOrder
+from .sizers import SetSizerNaturalTabOrder, SizerWindowsInLayoutOrder, IterSizerChildren
 
 def _Bitmap(b64data):
     return wx.Bitmap(wx.Image(io.BytesIO(binascii.a2b_base64(b64data))))
@@ -174,6 +174,18 @@ class DeepObjectList_Parameters:
         """
         raise NotImplementedError
 
+    def ItemEditorClass(self, obj):
+        """!
+        @brief The class of the DeepObjectItemEditor that CreateItemEditor returns for obj.
+        @param[in] obj	An object to be displayed/edited.
+        @return A DeepObjectItemEditor subclass.
+        @par[Description]
+            Used to find out whether an existing editor can be reused for obj, with reuse_editors
+            and in virtual mode.  The default creates an editor to find out: Override if that is
+            costly.
+        """
+        return type(self.CreateItemEditor(obj))
+
     def GetColumnTitles(self, parent):
         """!
         @brief Optional column titles, corresponding to the sizer items returned by DeepObjectItemEditor.Create.
@@ -203,29 +215,89 @@ class DeepObjectList_Parameters:
 
 class _Item:
     # Bookkeeping for an entry in the list.
-    def __init__(self, params, parent, readonly, initial_obj):
-        # 'initial_obj' is only to determine the item editor type.  SetValue(initial_obj) comes later.
+    def __init__(self, parent, initial_obj):
+        # The editor is given by DeepObjectList._attach_editor.  SetValue(initial_obj) comes later.
+        # In virtual mode, items outside the visible area are not materialized: They have no
+        # editor and no buttons, just the value, and a spacer in the sizer.
         self.parent = parent
         self.sizer_items = []
         self.gbz_positions = [] # list of (x,sizer_item) of things to move with the item
-        self.widget = params.CreateItemEditor(initial_obj)
-        self.sizer_items = self.widget.CreateOnto(parent, readonly)
+        self.widget = None
+        self.value = initial_obj # the value, while not materialized
         self._original_obj = initial_obj
         self.rowno = None
+        self.key = None # from DeepObjectList.SetValue(key=...)
+        self.gbz_row = None # the GridBagSizer row the item is placed at, None if not in the sizer
         self.buttons = []
+        self.handlers = [] # (button, event binder, handler) bound for this item
 
     def GetValue(self):
+        if self.widget is None:
+            return self.value
         return self.widget.GetValue()
 
     def SetValue(self, obj):
-        self.widget.SetValue(obj)
+        if self.widget is None:
+            self.value = obj
+        else:
+            self.widget.SetValue(obj)
 
     def Destroy(self):
-        self.widget.Destroy()
+        if self.widget is not None:
+            self.widget.Destroy()
         for but in self.buttons:
             but.Destroy()
 
 
+class _Batch:
+    # Sizer updates put off until the end of a DeepObjectList.batch().
+    def __init__(self, rowheights_before):
+        self.depth = 0
+        self.rebuild = False
+        self.size_change = 0
+        self.changed_rows = set()
+        self.values_set = False # editors have been given new values, which may change their size
+        self.rowheights_before = rowheights_before
+
+
+def _sizer_item_object(sz_it):
+    # The wx.Window or wx.Sizer of an item returned by DeepObjectItemEditor.Create.
+    if isinstance(sz_it, dict):
+        try:
+            return sz_it['window']
+        except KeyError:
+            return sz_it['sizer']
+    return sz_it
+
+
+def _hide_objects(objs):
+    # Hide wx.Window's and the windows in wx.Sizer's.  Returns the set of windows that were hidden
+    # already, for _show_objects.
+    hidden = set()
+    for obj in objs:
+        if isinstance(obj, wx.Window):
+            windows = [obj]
+        else:
+            windows = [w for sz,w in IterSizerChildren(obj)]
+        for w in windows:
+            if w.IsShown():
+                w.Hide()
+            else:
+                hidden.add(w)
+    return hidden
+
+def _show_objects(objs, hidden):
+    # Reverses _hide_objects.
+    for obj in objs:
+        if isinstance(obj, wx.Window):
+            windows = [obj]
+        else:
+            windows = [w for sz,w in IterSizerChildren(obj)]
+        for w in windows:
+            if w not in hidden:
+                w.Show()
+
+
 class DeepObjectList(wx.Panel):
     """!
     @brief Edit as list of objects.
@@ -257,14 +329,36 @@ class DeepObjectList(wx.Panel):
         cls._odd_bg = odd_bg or cls._odd_bg
         cls._title_bg = title_bg or cls._title_bg
 
-    def __init__(self, parent, id, param, readonly=False, initial_value=None):
+    def __init__(self, parent, id, param, readonly=False, initial_value=None,
+                 virtual=False, virtual_margin=10, virtual_row_height=30,
+                 reuse_editors=False, editor_pool_size=50):
+        """!
+        @param[in] reuse_editors	If True, SetValue keeps the existing item editors where the editor
+				class is unchanged, and just calls their SetValue.  Erased items'
+				controls are kept for reuse by new items.  See README.
+        @param[in] editor_pool_size	Max. number of unused item editors kept for reuse, per editor class.
+        @param[in] virtual	If True, only create item editors for the items in view, plus a margin.
+				For very long lists.  See README.
+        @param[in] virtual_margin	Number of rows above and below the visible area to keep editors for.
+        @param[in] virtual_row_height	Height to assume for rows that have yet to be shown.
+        """
         super().__init__(parent, id)
         self._param = param
         self._items = [] # list of _Item
+        self._virtual = virtual
+        self._virtual_margin = virtual_margin
+        self._virtual_row_height = virtual_row_height # updated with actual row heights as they're seen
+        self._virtual_update_pending = False
+        self._virtual_scroller = None # the scrolled window the list is viewed through, in virtual mode
+        self._reuse_editors = reuse_editors or virtual
+        self._editor_pool_size = editor_pool_size
+        self._editor_pool = {} # editor class => list of (editor, sizer_items, buttons, hidden windows)
+        self._batch = None # a _Batch inside 'with self.batch()'
         self._item_wxparent = self
         self._layout_callback = None
         self._fixed_adds = [] # list of (x,y,sizer_item) for permanent decoration
         self._append_but = None # last-line append button
+        self._append_row = None # the GridBagSizer row of self._append_but
         self._readonly = readonly
         self._title_background_colour = None # defaults to background
         self._growable_cols = set()
@@ -282,6 +376,7 @@ class DeepObjectList(wx.Panel):
         # Create the GUI structure.
         self._x0 = 0
         self._y0 = 0
+        self._add_col = self._erase_col = self._up_down_col = None
         if param.GetAddAllowed():
             self._add_col = self._x0
             self._x0 += 1
@@ -341,6 +436,9 @@ class DeepObjectList(wx.Panel):
         self.Bind(wx.EVT_MENU, self._OnUp, id=ID_MOVE_UP)
         self.Bind(wx.EVT_MENU, self._OnCancelSelect, id=ID_CANCEL_SELECT)
 
+        if virtual:
+            self._bind_virtual_scroller()
+
         if initial_value is None:
             self.SetValue([])
         else:
@@ -405,11 +503,23 @@ class DeepObjectList(wx.Panel):
     def SetLayoutCallback(self, callback):
         self._layout_callback = callback
 
-    def SetValue(self, val):
+    def SetValue(self, val, key=None):
         """
         @brief Assigns a value to the control.
         @param[in] val		A list of objects.
+        @param[in] key		Optional function from list element to a hashable key identifying it.
+				With a key, existing items are matched up with new elements by key,
+				and keep their editors, as far as possible.  See README.
         """
+        if key is not None:
+            self._keyed_SetValue(list(val), key)
+            return
+        if self._reuse_editors:
+            val = list(val)
+            self._reconcile([(self._items[i] if i < len(self._items) else None, None, item_val)
+                             for i,item_val in enumerate(val)])
+            return
+
         if len(self._items) > 0:
             for it in self._items:
                 it.Destroy()
@@ -424,54 +534,357 @@ class DeepObjectList(wx.Panel):
                 it.SetValue(it._original_obj)
         self._rebuild_gbz(size_change=len(self._items), SetValue_callback=SetValue_callback)
 
+    def _keyed_SetValue(self, val, key):
+        new_keys = [key(item_val) for item_val in val]
+        if len(set(new_keys)) != len(new_keys):
+            raise ValueError('SetValue: duplicate keys')
+        by_key = {}
+        for it in self._items:
+            k = it.key
+            if k is None:
+                # Added through the GUI, or set without a key: Key by the current value.
+                try:
+                    k = key(it.GetValue())
+                except Exception:
+                    continue
+            by_key.setdefault(k, it) # for duplicates, the first one wins and the rest are erased
+        self._reconcile([(by_key.get(k), k, item_val) for k,item_val in zip(new_keys, val)])
+
+    def _reconcile(self, matches):
+        # Change the list to have the values in 'matches', a list of (item, key, value): Existing
+        # items are kept, and keep their editors if the editor class stays the same.  Where item is
+        # None, a new item is created.  Items not in 'matches' are erased.  Then one _update_gbz
+        # re-positions whatever has moved.
+        size_change = len(matches) - len(self._items)
+        kept = set(it for it,k,item_val in matches if it is not None)
+        for it in self._items:
+            if it not in kept:
+                self._discard_item(it)
+
+        # Pool all unwanted editors before creating any, so that they can be reused right away.
+        retyped = []
+        for it,k,item_val in matches:
+            if it is None or it.widget is None:
+                continue
+            if self._param.ItemEditorClass(item_val) is not type(it.widget):
+                self._gbz_detach_item(it)
+                self._pool_editor(it)
+                retyped.append((it, item_val))
+        retyped_items = set(it for it,item_val in retyped)
+        new_items = []
+        set_values = [] # (item, value) to SetValue once in the sizer
+        for it,k,item_val in matches:
+            if it is None:
+                it = self._create_item(item_val)
+                set_values.append((it, item_val))
+            elif it in retyped_items:
+                set_values.append((it, item_val))
+            else:
+                try:
+                    unchanged = it.GetValue() == item_val
+                except Exception:
+                    unchanged = False
+                if not unchanged: # avoid disturbing an editor, e.g. its cursor position, needlessly
+                    it.SetValue(item_val)
+            it.key = k
+            new_items.append(it)
+        for it,item_val in retyped:
+            self._attach_editor(it, item_val)
+            it.rowno = None # for NotifyPosition
+        self._items = new_items
+
+        def SetValue_callback():
+            for it,item_val in set_values:
+                it.SetValue(item_val)
+        self._update_gbz(size_change=size_change, SetValue_callback=SetValue_callback)
+
     def Extend(self, item_vals):
         new_items = list(map(self._create_item, item_vals))
         self._items.extend(new_items)
         for it in new_items:
             it.SetValue(it._original_obj)
-        self._rebuild_gbz(size_change=len(new_items))
+        self._update_gbz(size_change=len(new_items))
 
     def Append(self, item_val):
         self.Extend([item_val])
 
+    def Insert(self, index, item_val):
+        """!
+        @brief Add an item to the list.
+        @param[in] index	Position of the new item, as for list.insert.
+        @param[in] item_val	The object.
+        """
+        new_item = self._create_item(item_val)
+        self._items.insert(index, new_item)
+        self._update_gbz(size_change=+1, SetValue_callback=lambda:new_item.SetValue(item_val))
+
+    def Remove(self, index):
+        """!
+        @brief Erase an item from the list, without asking ConfirmErase.
+        @param[in] index	Position of the item.
+        """
+        item = self._items[index]
+        self._discard_item(item)
+        del self._items[item.rowno]
+        item.rowno = "formerly %s" % (item.rowno,) # for debugging
+        self._update_gbz(size_change=-1)
+
+    def Move(self, from_index, to_index):
+        """!
+        @brief Move an item to a different position in the list.
+        @param[in] from_index	Current position of the item.
+        @param[in] to_index	Position of the item after the move.
+        """
+        self._items.insert(to_index, self._items.pop(from_index))
+        self._update_gbz(size_change=0)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """!
+        @brief Context manager for making many changes to the list in one go.
+        @detail
+        Inside the with block, SetValue, Extend, Insert, Remove, Move etc. update the list
+        content and the item editors' values, but the GridBagSizer, Layout and layout callback
+        are only updated once, at the end of the block.  The panel is frozen meanwhile.  Batches
+        can be nested.
+        """
+        if self._batch is None:
+            self._batch = _Batch(self._gbz.GetRowHeights())
+            self.Freeze()
+        batch = self._batch
+        batch.depth += 1
+        try:
+            yield self
+        finally:
+            batch.depth -= 1
+            if batch.depth == 0:
+                self._batch = None
+                try:
+                    if batch.rebuild:
+                        self._rebuild_gbz(batch.size_change, batch=batch)
+                    elif batch.size_change != 0 or len(batch.changed_rows) > 0 or batch.values_set:
+                        self._update_gbz(batch.size_change, batch=batch)
+                finally:
+                    self.Thaw()
+
     def _create_item(self, item_val):
-        it = _Item(self._param, self._item_wxparent, self._readonly, item_val)
+        # In virtual mode, items start out unmaterialized, and _update_virtual materializes the ones
+        # in view after the next sizer update.
+        it = _Item(self._item_wxparent, item_val)
+        if self._virtual:
+            self._set_spacer(it, self._virtual_row_height)
+        else:
+            self._attach_editor(it, item_val)
+        return it
+
+    def _attach_editor(self, it, obj):
+        # Give an item without an editor a pooled editor of the class for 'obj', or else a new one.
+        # The item must be out of the sizer.
+        if self._editor_pool:
+            pooled = self._editor_pool.get(self._param.ItemEditorClass(obj))
+        else:
+            pooled = None # skip ItemEditorClass, which may create an editor
+        if pooled:
+            it.widget, it.sizer_items, buttons, hidden = pooled.pop()
+            _show_objects([_sizer_item_object(szi) for szi in it.sizer_items if szi is not None] + buttons, hidden)
+        else:
+            editor = it.widget = self._param.CreateItemEditor(obj)
+            it.sizer_items = editor.CreateOnto(self._item_wxparent, self._readonly)
+            buttons = None
+        it.value = None
+        self._equip_item(it, buttons)
+
+    def _discard_item(self, it):
+        # Take an item out of the sizer and destroy it, keeping the controls for reuse if enabled.
+        if it.widget is None:
+            self._remove_spacer(it)
+        else:
+            self._gbz_detach_item(it)
+            if self._reuse_editors:
+                self._pool_editor(it)
+        it.Destroy()
+        self._move_select_items.discard(it)
+
+    def _equip_item(self, it, buttons=None):
+        # Set up gbz_positions and buttons for the editor in it.widget/it.sizer_items.  Pass buttons
+        # from a recycled item to reuse those, instead of creating new ones.
         it.widget.SetLayoutCallback(self._layout_callback)
+        it.gbz_positions = []
         for colno,szi in enumerate(it.sizer_items):
             if szi is not None:
                 x = self._x0 + colno
                 it.gbz_positions.append((x,szi))
+        reuse = list(buttons or [])
         for col,hint,mk_handler,bm in [
             (self._add_col, self._hint_add, self._mkOnAddBefore, self._add_bm),
             (self._erase_col, self._hint_erase, self._mkOnErase, self._erase_bm),
             (self._up_down_col, self._hint_up_down, None, self._up_down_bm),
             ]:
             if col is not None:
-                but = wx.BitmapButton(self._item_wxparent, -1, bm, size=(bm.GetWidth()+10, bm.GetHeight()+10))
-                but.SetAcceleratorTable(self._normal_acc)
-                but.SetToolTip(hint)
+                if len(reuse) > 0:
+                    but = reuse.pop(0)
+                else:
+                    but = wx.BitmapButton(self._item_wxparent, -1, bm, size=(bm.GetWidth()+10, bm.GetHeight()+10))
+                    but.SetAcceleratorTable(self._normal_acc)
+                    but.SetToolTip(hint)
                 if mk_handler is not None:
-                    but.Bind(wx.EVT_BUTTON, mk_handler(but, it))
+                    self._bind_button(it, but, wx.EVT_BUTTON, mk_handler(but, it))
                 else:
                     it.move_button = but
-                    but.Bind(wx.EVT_LEFT_DOWN, self._mk_On_UpDown_buttondown(but, it))
-                    but.Bind(wx.EVT_LEFT_UP, self._mk_OnUpDown_buttonup(but, it))
-                    but.Bind(wx.EVT_BUTTON, self._mk_OnUpDown_buttonpress(but, it))
+                    self._bind_button(it, but, wx.EVT_LEFT_DOWN, self._mk_On_UpDown_buttondown(but, it))
+                    self._bind_button(it, but, wx.EVT_LEFT_UP, self._mk_OnUpDown_buttonup(but, it))
+                    self._bind_button(it, but, wx.EVT_BUTTON, self._mk_OnUpDown_buttonpress(but, it))
                 it.buttons.append(but)
                 it.gbz_positions.append((col,but))
-        return it
 
-    def _rebuild_gbz(self, size_change, SetValue_callback=None):
+    def _bind_button(self, it, but, evt, handler):
+        but.Bind(evt, handler)
+        it.handlers.append((but, evt, handler))
+
+    def _pool_editor(self, it):
+        # Take the editor and buttons away from a materialized item, hide them and keep them for
+        # reuse by _attach_editor.  The item must already be out of the sizer.
+        objs = [_sizer_item_object(szi) for x,szi in it.gbz_positions]
+        for but,evt,handler in it.handlers:
+            but.Unbind(evt, handler=handler)
+        it.handlers = []
+        if self._up_down_col is not None:
+            it.move_button.SetBitmap(self._up_down_bm) # not showing as selected when reused
+        pool = self._editor_pool.setdefault(type(it.widget), [])
+        pool.append((it.widget, it.sizer_items, it.buttons, _hide_objects(objs)))
+        if len(pool) > self._editor_pool_size:
+            editor, sizer_items, buttons, hidden = pool.pop(0)
+            editor.Destroy()
+            for but in buttons:
+                but.Destroy()
+        it.widget = None
+        it.sizer_items = []
+        it.buttons = []
+        it.gbz_positions = []
+
+    def _set_spacer(self, it, height):
+        # Placeholder for an item that is not materialized, to give the row its expected height.
+        spacer = wx.BoxSizer(wx.VERTICAL)
+        spacer.Add(1, height)
+        it.gbz_positions = [(0, dict(sizer=spacer, flag=0, border=0))]
+
+    def _remove_spacer(self, it):
+        # Take the spacer of an item that is not materialized out of the sizer, and delete it.
+        for x,spacer in it.gbz_positions:
+            self._gbz.Remove(spacer['sizer']) # deletes the spacer sizer, unlike Detach
+        it.gbz_positions = []
+        it.gbz_row = None
+
+    def _park(self, it):
+        # Virtual mode: Replace the editor of an item out of view with a spacer.
+        try:
+            it.value = it.widget.GetValue()
+        except:
+            return # keep it, like OnErase, a value that can't be read must not be lost
+        height = self._gbz.GetRowHeights()[it.gbz_row]
+        self._virtual_row_height = height
+        self._gbz_detach_item(it)
+        self._pool_editor(it)
+        self._set_spacer(it, height)
+        self._gbz_add_item(it)
+
+    def _materialize(self, it):
+        # Virtual mode: Give an item that has come into view an editor, recycled if possible.
+        value = it.value
+        self._remove_spacer(it)
+        self._attach_editor(it, value)
+        self._gbz_add_item(it)
+        it.widget.SetValue(value)
+        it.widget.NotifyPosition(index=it.rowno, bgcol=self._even_bg if it.rowno%2==0 else self._odd_bg)
+
+    def _bind_virtual_scroller(self):
+        # Watch the nearest scrolled window, or else the top-level window, for changes to what
+        # part of the list is in view.
+        scroller = self.GetParent()
+        while scroller is not None and not isinstance(scroller, wx.ScrolledWindow) and not scroller.IsTopLevel():
+            scroller = scroller.GetParent()
+        if scroller is None:
+            scroller = self
+        self._virtual_scroller = scroller
+        handlers = [(wx.EVT_SCROLLWIN, self._OnVirtualViewChange),
+                    (wx.EVT_MOUSEWHEEL, self._OnVirtualViewChange),
+                    (wx.EVT_SIZE, self._OnVirtualViewChange)]
+        for evt,handler in handlers:
+            scroller.Bind(evt, handler)
+        def OnDestroy(event):
+            event.Skip()
+            if event.GetEventObject() is self and scroller is not self:
+                for evt,handler in handlers:
+                    scroller.Unbind(evt, handler=handler)
+        self.Bind(wx.EVT_WINDOW_DESTROY, OnDestroy)
+
+    def _OnVirtualViewChange(self, event):
+        event.Skip()
+        self._schedule_virtual_update()
+
+    def _schedule_virtual_update(self):
+        # Coalesce: Scroll positions are updated after the scroll event, so update after that.
+        if not self._virtual_update_pending:
+            self._virtual_update_pending = True
+            wx.CallAfter(self._update_virtual)
+
+    def _visible_span(self):
+        # (top,bottom) of the part of the list in view, in client coordinates.
+        scroller = self._virtual_scroller
+        if scroller is self:
+            return 0, self.GetClientSize().Height
+        top = self.ScreenToClient(scroller.ClientToScreen(wx.Point(0,0))).y
+        return top, top + scroller.GetClientSize().Height
+
+    def _update_virtual(self):
+        # Virtual mode: Materialize the items in view, plus a margin, and park the rest.
+        self._virtual_update_pending = False
+        if not self:
+            return # destroyed
+        if self._batch is not None:
+            return # done at the end of the batch
+        top,bottom = self._visible_span()
+        margin = self._virtual_margin * self._virtual_row_height
+        rowheights = self._gbz.GetRowHeights()
+        y = sum(rowheights[:self._y0])
+        wanted = set()
+        for it in self._items:
+            row = self._y0 + it.rowno
+            h = rowheights[row] if row < len(rowheights) else self._virtual_row_height
+            if y + h >= top - margin and y < bottom + margin:
+                wanted.add(it.rowno)
+            y += h
+
+        focus = wx.Window.FindFocus()
+        park = [it for it in self._items
+                if it.widget is not None and it.rowno not in wanted
+                and it not in self._move_select_items
+                and focus not in self._row_focus_windows(it.rowno)]
+        materialize = [self._items[rowno] for rowno in sorted(wanted) if self._items[rowno].widget is None]
+        if len(park) == 0 and len(materialize) == 0:
+            return
+        for it in park:
+            self._park(it)
+        for it in materialize:
+            self._materialize(it)
+        self._fix_tab_order([it.rowno for it in materialize])
+        self._gbz.Layout()
+        if sum(self._gbz.GetRowHeights()) != sum(rowheights) and self._layout_callback is not None:
+            self._layout_callback()
+        self.RefreshRect(wx.Rect(0, top, self.GetSize().Width, bottom-top))
+
+    def _rebuild_gbz(self, size_change, SetValue_callback=None, batch=None):
         #@brief Rebuilds the GridBagSizer to reflect new items added, removed or moved around.
         #@param[in] size_change		How the count of items has changed since the last call.
         #@param[in] SetValue_callback	To be called *after* the sizer hierarchy has been built but
         #				*before* Layout. This works around an ExpandoTextCtrl.SetValue bug which gets
         #				the size wrong, if the control is not yet in a sizer.
-        changed_rows = self._renumber_items()
+        #@param[in] batch		The _Batch being completed, if any.
+        changed_rows, rowheights_before = self._begin_gbz_update(size_change, SetValue_callback, True, batch)
+        if changed_rows is None:
+            return # in a batch
         gbz = self._gbz
 
-        rowheights_before = gbz.GetRowHeights()
-
         # Detach all sizers and windows from the GridBagSizer without destroying them.
         for i in reversed(range(gbz.GetItemCount())):
             gbz.Detach(i)
@@ -480,36 +893,151 @@ class DeepObjectList(wx.Panel):
         for x,y,sz_it in self._fixed_adds:
             self._gbz.Add(sz_it, pos=(y,x), border=3, flag=wx.ALL)
         for it in self._items:
-            for x,sz_it in it.gbz_positions:
-                Add_args = dict(flag=0)
-                if x < self._x0:
-                    Add_args['border'] = 3
-                    Add_args['flag'] = wx.LEFT|wx.RIGHT|wx.ALIGN_CENTER_VERTICAL
-                else:
-                    Add_args['border'] = 3
-                    Add_args['flag'] |= wx.ALL
-                if isinstance(sz_it, dict):
-                    Add_args.update(sz_it)
-                    try:
-                        w = Add_args.pop('window')
-                    except KeyError:
-                        w = Add_args.pop('sizer')
-                    expand = (Add_args['flag'] & wx.EXPAND) != 0
-                else:
-                    w = sz_it
-                    expand = False
+            self._gbz_add_item(it)
+        self._gbz_add_append_button()
+        SetSizerNaturalTabOrder(gbz)
+
+        self._finish_gbz_update(size_change, changed_rows, rowheights_before, SetValue_callback)
 
-                self._gbz.Add(w, pos=(self._y0+it.rowno, x), **Add_args)
-                if expand and x not in self._growable_cols:
-                    self._growable_cols.add(x)
-                    self._gbz.AddGrowableCol(x)
+    def _update_gbz(self, size_change, SetValue_callback=None, batch=None):
+        #@brief Like _rebuild_gbz, but only re-positions the items that have been added or moved.
+        #@param[in] size_change		How the count of items has changed since the last call.
+        #@param[in] SetValue_callback	As for _rebuild_gbz.
+        #@param[in] batch		As for _rebuild_gbz.
+        # Removed items must already have been taken out with _gbz_detach_item.
+        changed_rows, rowheights_before = self._begin_gbz_update(size_change, SetValue_callback, False, batch)
+        if changed_rows is None:
+            return # in a batch
+        gbz = self._gbz
 
+        # Detach everything that moves before adding anything, so that an item is never added at
+        # a position that is still occupied.
+        moved = [it for it in self._items if it.gbz_row != self._y0 + it.rowno]
+        for it in moved:
+            if it.gbz_row is not None:
+                self._gbz_detach_item(it)
+        append_moved = self._append_but is not None and self._append_row != self._y0 + len(self._items)
+        if append_moved:
+            gbz.Detach(self._append_but)
+        for it in moved:
+            self._gbz_add_item(it)
+        if append_moved:
+            self._gbz_add_append_button()
+
+        fix_rows = [it.rowno for it in moved]
+        if append_moved:
+            fix_rows.append(len(self._items))
+        self._fix_tab_order(fix_rows)
+
+        self._finish_gbz_update(size_change, changed_rows, rowheights_before, SetValue_callback)
+
+    def _begin_gbz_update(self, size_change, SetValue_callback, rebuild, batch):
+        # Renumber items, and either put off the rest of the update until the end of the current
+        # batch, returning (None,None), or return (changed_rows, rowheights_before) to go ahead.
+        # Rows are renumbered right away, because event handlers and Insert etc. go by rowno.
+        # In a batch, SetValue_callback is called right away too, before the new items are in the
+        # sizer: Later changes in the batch may read the values, or discard the items.
+        changed_rows = self._renumber_items()
+        if self._batch is not None:
+            self._batch.rebuild |= rebuild
+            self._batch.size_change += size_change
+            self._batch.changed_rows.update(changed_rows)
+            if SetValue_callback is not None:
+                SetValue_callback()
+                self._batch.values_set = True
+            return None, None
+        if batch is not None:
+            return sorted(batch.changed_rows.union(changed_rows)), batch.rowheights_before
+        return changed_rows, self._gbz.GetRowHeights()
+
+    def _gbz_add_item(self, it):
+        y = self._y0 + it.rowno
+        for x,sz_it in it.gbz_positions:
+            Add_args = dict(flag=0)
+            if x < self._x0:
+                Add_args['border'] = 3
+                Add_args['flag'] = wx.LEFT|wx.RIGHT|wx.ALIGN_CENTER_VERTICAL
+            else:
+                Add_args['border'] = 3
+                Add_args['flag'] |= wx.ALL
+            if isinstance(sz_it, dict):
+                Add_args.update(sz_it)
+                try:
+                    w = Add_args.pop('window')
+                except KeyError:
+                    w = Add_args.pop('sizer')
+                expand = (Add_args['flag'] & wx.EXPAND) != 0
+            else:
+                w = sz_it
+                expand = False
+
+            self._gbz.Add(w, pos=(y, x), **Add_args)
+            if expand and x not in self._growable_cols:
+                self._growable_cols.add(x)
+                self._gbz.AddGrowableCol(x)
+        it.gbz_row = y
+
+    def _gbz_detach_item(self, it):
+        # Take the item's windows and sizers out of the GridBagSizer, without destroying them.
+        for x,sz_it in it.gbz_positions:
+            self._gbz.Detach(_sizer_item_object(sz_it))
+        it.gbz_row = None
+
+    def _gbz_add_append_button(self):
         if self._append_but is not None:
-            lastline_y = self._y0 + len(self._items)
-            self._gbz.Add(self._append_but, pos=(lastline_y, self._add_col),
+            self._append_row = self._y0 + len(self._items)
+            self._gbz.Add(self._append_but, pos=(self._append_row, self._add_col),
                           border=3, flag=wx.LEFT|wx.RIGHT|wx.ALIGN_CENTER_VERTICAL)
-        SetSizerNaturalTabOrder(gbz)
 
+    def _row_focus_windows(self, rowno):
+        # The windows that accept focus on a row, in layout order.  Row -1 is the column titles,
+        # and row len(self._items) is the append button.
+        if rowno < 0:
+            objs = [sz_it for x,y,sz_it in sorted(self._fixed_adds, key=lambda xyi:xyi[0])]
+        elif rowno < len(self._items):
+            objs = [_sizer_item_object(sz_it)
+                    for x,sz_it in sorted(self._items[rowno].gbz_positions, key=lambda xi:xi[0])]
+        elif self._append_but is not None:
+            objs = [self._append_but]
+        else:
+            objs = []
+        windows = []
+        for obj in objs:
+            if isinstance(obj, wx.Window):
+                windows.append(obj)
+            else:
+                windows.extend(SizerWindowsInLayoutOrder(obj))
+        return [win for win in windows if win.AcceptsFocus()]
+
+    def _fix_tab_order(self, rows):
+        # Local version of SetSizerNaturalTabOrder: Place the windows of the given rows in the tab
+        # order after the windows of the row above.  Rows are processed top-down, so that a run
+        # of changed rows ends up in order, followed by whatever followed the run before.
+        for rowno in sorted(set(rows)):
+            windows = self._row_focus_windows(rowno)
+            if len(windows) == 0:
+                continue
+            prev = None
+            for r in range(rowno-1, -2, -1):
+                before = self._row_focus_windows(r)
+                if len(before) > 0:
+                    prev = before[-1]
+                    break
+            if prev is None:
+                # Nothing above: Place the row before the first window below.
+                for r in range(rowno+1, len(self._items)+1):
+                    after = self._row_focus_windows(r)
+                    if len(after) > 0:
+                        windows[0].MoveBeforeInTabOrder(after[0])
+                        break
+                prev = windows[0]
+                windows = windows[1:]
+            for win in windows:
+                win.MoveAfterInTabOrder(prev)
+                prev = win
+
+    def _finish_gbz_update(self, size_change, changed_rows, rowheights_before, SetValue_callback):
+        gbz = self._gbz
         if SetValue_callback is not None:
             SetValue_callback()
         gbz.Layout()
@@ -519,6 +1047,9 @@ class DeepObjectList(wx.Panel):
             # The width available to the gbz may have changed, requiring a Refresh.
             # However, we assume that whatever Refresh is necessary has been trigged by the callback.
 
+        if self._virtual:
+            self._schedule_virtual_update()
+
         # A full self.Refresh() causes flicker, so compute the precise refresh needed and do a more
         # limited RefreshRect.
         #
@@ -560,7 +1091,8 @@ class DeepObjectList(wx.Panel):
         for rowno,it in enumerate(self._items):
             if it.rowno != rowno:
                 changed_rows.append(rowno)
-                it.widget.NotifyPosition(index=rowno, bgcol=self._even_bg if rowno%2==0 else self._odd_bg)
+                if it.widget is not None:
+                    it.widget.NotifyPosition(index=rowno, bgcol=self._even_bg if rowno%2==0 else self._odd_bg)
             it.rowno = rowno
         return changed_rows
             
@@ -572,9 +1104,7 @@ class DeepObjectList(wx.Panel):
             except CancelOperation:
                 pass
             else:
-                new_item = self._create_item(new_obj)
-                self._items.insert(item.rowno, new_item)
-                self._rebuild_gbz(size_change=+1, SetValue_callback=lambda:new_item.SetValue(new_obj))
+                self.Insert(item.rowno, new_obj)
         return OnAddBefore
 
     def _OnAppendNew(self, event):
@@ -583,9 +1113,7 @@ class DeepObjectList(wx.Panel):
         except CancelOperation:
             pass
         else:
-            new_item = self._create_item(new_obj)
-            self._items.append(new_item)
-            self._rebuild_gbz(size_change=+1, SetValue_callback=lambda:new_item.SetValue(new_obj))
+            self.Insert(len(self._items), new_obj)
 
     def _show_move_icon(self, item, i_move):
         if i_move:
@@ -629,7 +1157,7 @@ class DeepObjectList(wx.Panel):
                 for it in self._move_select_items:
                     self._show_move_icon(it, False)
                 self._move_select_items.clear()
-                self._rebuild_gbz(size_change=0)
+                self._update_gbz(size_change=0)
 
             elif up_item is not None and up_item == self._buttondown_item:
                 self._flip_move_button_status(item)
@@ -685,7 +1213,7 @@ class DeepObjectList(wx.Panel):
                 for item in reversed(move_items):
                     del self._items[item.rowno]
                 self._items[insert_at:insert_at] = move_items
-                self._rebuild_gbz(size_change=0)
+                self._update_gbz(size_change=0)
 
     def _OnDown(self, event):
         if len(self._move_select_items)==0:
@@ -697,7 +1225,7 @@ class DeepObjectList(wx.Panel):
                 for item in reversed(move_items):
                     del self._items[item.rowno]
                 self._items[insert_at:insert_at] = move_items
-                self._rebuild_gbz(size_change=0)
+                self._update_gbz(size_change=0)
 
     def _flip_move_button_status(self, item):
         if item in self._move_select_items:
@@ -719,12 +1247,7 @@ class DeepObjectList(wx.Panel):
             else:
                 if not self._param.ConfirmErase(but, item.rowno, val):
                     return
-            item.Destroy()
-            del self._items[item.rowno]
-            if item in self._move_select_items:
-                self._move_select_items.discard(item)
-            item.rowno = "formerly %s" % (item.rowno,) # for debugging
-            self._rebuild_gbz(size_change=-1)
+            self.Remove(item.rowno)
         return OnErase
 
     def GetValue(self):
@@ -737,6 +1260,6 @@ class DeepObjectList(wx.Panel):
     def GetItemEditors(self):
         """!
         @brief Get the object editors for the list as it currently stands.
-        @return A list of DeepObjectItemEditor.
+        @return A list of DeepObjectItemEditor.  In virtual mode, None for items not in view.
         """
         return [it.widget for it in self._items]
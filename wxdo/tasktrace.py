@@ -0,0 +1,96 @@
+import collections, json, os
+
+class Section(collections.namedtuple('Section', 'task wxobj side thread_id queued started ended')):
+    """!
+    @brief Timing of one section of an aslong task: A stretch of code between two thread switches.
+    @detail
+    task	Name of the task function.
+    wxobj	Name of the wx object the task runs on.
+    side	'ui' or 'bg'.
+    thread_id	threading.get_ident() of the thread that ran the section.
+    queued	time.perf_counter() when the section was posted to the WxQueue or WorkerThread,
+		or None for the first section of a task, which runs directly in the event handler.
+    started	time.perf_counter() when the section started running.
+    ended	time.perf_counter() when the section stopped running.
+    """
+    __slots__ = ()
+
+    @property
+    def queue_wait_s(self):
+        """!
+        @brief Time spent waiting in the WxQueue or WorkerThread before running.
+        """
+        if self.queued is None:
+            return 0.0
+        return self.started - self.queued
+
+    @property
+    def run_s(self):
+        """!
+        @brief Time spent running.
+        """
+        return self.ended - self.started
+
+
+class RingBuffer:
+    """!
+    @brief Trace sink that keeps the most recent sections in memory.
+    """
+    def __init__(self, maxlen=10000):
+        """!
+        @param[in] maxlen	Number of sections to keep.
+        """
+        self._sections = collections.deque(maxlen=maxlen)
+
+    def __call__(self, section):
+        self._sections.append(section) # deque.append is thread safe
+
+    def sections(self):
+        """!
+        @brief The sections recorded, oldest first.
+        @return A list of Section's.
+        """
+        return list(self._sections)
+
+    def clear(self):
+        self._sections.clear()
+
+
+class ChromeTrace(RingBuffer):
+    """!
+    @brief Trace sink that exports sections in the Chrome trace event format.
+    @detail
+    Load the file written by 'save' in chrome://tracing or https://ui.perfetto.dev.  Each section
+    is shown as a slice on the thread that ran it, with the queue wait as an argument.
+    """
+    def events(self):
+        """!
+        @brief The recorded sections as a list of trace event dicts.
+        """
+        pid = os.getpid()
+        events = []
+        for section in self.sections(): # a copy, as sections may be recorded meanwhile
+            events.append(dict(
+                name=section.task,
+                cat=section.side,
+                ph='X',
+                ts=section.started * 1e6,
+                dur=section.run_s * 1e6,
+                pid=pid,
+                tid=section.thread_id,
+                args=dict(wxobj=section.wxobj, queue_wait_ms=section.queue_wait_s * 1e3),
+                ))
+        return events
+
+    def dumps(self):
+        """!
+        @brief The trace as a JSON string.
+        """
+        return json.dumps(dict(traceEvents=self.events(), displayTimeUnit='ms'))
+
+    def save(self, path):
+        """!
+        @brief Write the trace to a JSON file.
+        """
+        with open(path, 'w') as f:
+            f.write(self.dumps())
@@ -0,0 +1,153 @@
+import sys, time, threading, traceback, logging, collections
+import wx
+from . import wxqueue, workerthread, aslong
+
+logger = logging.getLogger(__name__)
+
+
+class Stall(collections.namedtuple('Stall', 'delay_s stack task coroutine_frame')):
+    """!
+    @brief Report of the UI thread not responding.
+    @detail
+    delay_s		How long the UI thread had been unresponsive when the stack was captured.
+    stack		The UI thread's stack at that time, formatted as by traceback.format_stack.
+    task		Name of the aslong task running on the UI thread, or None.
+    coroutine_frame	For the task: 'File "...", line N, in function' of its coroutine, or None.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        lines = ['UI thread stalled for %.3f s' % (self.delay_s,)]
+        if self.task is not None:
+            lines.append('in aslong task %s, at %s' % (self.task, self.coroutine_frame))
+        lines.append('UI thread stack (most recent call last):')
+        lines.append(''.join(self.stack).rstrip())
+        return '\n'.join(lines)
+
+
+class StallWatchdog:
+    """!
+    @brief Detects and reports the UI thread being unresponsive.
+    @detail
+    A watchdog thread posts a heartbeat to the UI thread every interval_s, and measures how long
+    it takes for the UI thread to get to it.  When that takes longer than threshold_s, it reports
+    a Stall, with the UI thread's stack and the aslong task running on the UI thread, if any.
+    A stall is reported once, however long it lasts.
+
+    Start and stop on the UI thread.
+    """
+    def __init__(self, threshold_s=0.5, interval_s=0.1, on_stall=None):
+        """!
+        @param[in] threshold_s	UI response time that counts as a stall.
+        @param[in] interval_s	Time between heartbeats.
+        @param[in] on_stall	Called as on_stall(stall) with a Stall, on the watchdog thread.
+				If None, the stall is logged as a warning.
+        """
+        self._threshold_s = threshold_s
+        self._interval_s = interval_s
+        self._on_stall = on_stall
+        self._evthandler = None
+        self._wxq = None
+        self._worker = None
+        self._stopped = None
+        self._ui_thread_id = None
+        self._lock = threading.Lock()
+        self._stalls = 0
+        self._last_delay_s = None
+        self._max_delay_s = 0.0
+
+    def start(self):
+        """!
+        @brief Start watching.  Call on the UI thread.
+        """
+        if self._worker is not None:
+            return
+        self._ui_thread_id = threading.get_ident()
+        # A fresh queue and stop flag for each run, so that a watchdog thread still finishing off
+        # a previous run can't get mixed up with this one.  The queue has a hidden wx.EvtHandler
+        # of its own, as a window can only have one WxQueue, and aslong may need that.
+        self._evthandler = wx.EvtHandler()
+        wxq = self._wxq = wxqueue.WxQueue(self._evthandler, _beat)
+        stopped = self._stopped = threading.Event()
+        self._worker = workerthread.WorkerThread(min_threads=1)
+        self._worker.job(lambda: self._watch(wxq, stopped))
+
+    def stop(self):
+        """!
+        @brief Stop watching.  Call on the UI thread.
+        """
+        if self._worker is None:
+            return
+        self._stopped.set()
+        self._worker.close()
+        self._worker = None
+        self._wxq.Unbind()
+        self._wxq = None
+        self._evthandler = None
+
+    def stats(self):
+        """!
+        @brief Heartbeat statistics.
+        @return A dict with:
+            stalls		Number of stalls reported.
+            last_delay_s	Round-trip time of the most recent heartbeat.
+            max_delay_s		Longest round-trip time seen.
+        """
+        with self._lock:
+            return dict(stalls=self._stalls, last_delay_s=self._last_delay_s,
+                        max_delay_s=self._max_delay_s)
+
+    def _watch(self, wxq, stopped):
+        # Runs on the watchdog thread until stopped.
+        while not stopped.is_set():
+            ack = threading.Event()
+            t0 = time.monotonic()
+            wxq.put(ack.set)
+            if not ack.wait(self._threshold_s):
+                if stopped.is_set():
+                    break
+                self._report(self._capture(time.monotonic() - t0))
+                while not ack.wait(self._interval_s):
+                    if stopped.is_set():
+                        return
+            delay_s = time.monotonic() - t0
+            with self._lock:
+                self._last_delay_s = delay_s
+                self._max_delay_s = max(self._max_delay_s, delay_s)
+            stopped.wait(self._interval_s)
+
+    def _capture(self, delay_s):
+        frame = sys._current_frames().get(self._ui_thread_id)
+        if frame is None:
+            return Stall(delay_s, [], None, None)
+        stack = traceback.format_stack(frame)
+        task = coroutine_frame = None
+        tip = _find_task(frame)
+        if tip is not None:
+            task = str(tip._task)
+            cr_frame = tip._coroutine.cr_frame
+            if cr_frame is not None:
+                coroutine_frame = 'File "%s", line %d, in %s' % (
+                    cr_frame.f_code.co_filename, cr_frame.f_lineno, cr_frame.f_code.co_name)
+        return Stall(delay_s, stack, task, coroutine_frame)
+
+    def _report(self, stall):
+        with self._lock:
+            self._stalls += 1
+        if self._on_stall is not None:
+            self._on_stall(stall)
+        else:
+            logger.warning('%s', stall)
+
+
+def _beat(wxevthandler, ack):
+    ack()
+
+def _find_task(frame):
+    # The innermost _TaskInProgress running a UI section on the stack, if any.
+    foreground_continuation = aslong._TaskInProgress.foreground_continuation.__code__
+    while frame is not None:
+        if frame.f_code is foreground_continuation:
+            return frame.f_locals.get('self')
+        frame = frame.f_back
+    return None
@@ -1,42 +1,188 @@
-import threading, queue, sys, time, logging
+import threading, queue, sys, os, time, logging, heapq, itertools, collections
 
 logger = logging.getLogger(__name__)
 
+# Jobs are queued as (-priority, sequence number, job) tuples: Higher priority first, and FIFO
+# order within the same priority.
+_last_in_line = (float('inf'),) # sorts after any job, for the None that ends a thread
+
 class WorkerThread:
     """!
     @brief A worker thread to post callables onto.
     @detail
     The thread is automatically destroyed after a second of inactivity, and recreated as necessary.
+    Jobs run in order of priority, and in FIFO order within the same priority.
+
+    For bursty work, where the gaps between bursts are longer than timeout_s, that means creating
+    a new thread for every burst.  To avoid that, either keep the thread warm with min_threads=1,
+    or use adaptive_timeout=True, to have the idle timeout follow the observed length of the idle
+    periods between bursts.
+
+    With max_workers > 1, jobs run in parallel on up to max_workers threads, except that jobs with
+    the same ordering key run one at a time, in order.  Jobs with key None have no ordering
+    constraint.  The key is passed to 'job', or computed by the ordering_key callable.  With
+    max_workers=1, the default, all jobs run one at a time, in order, whatever their keys.
     """
-    def __init__(self, onerror=None, timeout_s=None):
+    def __init__(self, onerror=None, timeout_s=None, min_threads=0, adaptive_timeout=False, max_timeout_s=60,
+                 max_workers=1, ordering_key=None):
         """!
         @param[in] onerror	Called when a job fails with an exception.
         @param[in] timeout_s	Idle duration before the thread is shuttered (default 1).
+        @param[in] min_threads	Once started, the number of threads to keep alive even when idle.
+				A thread kept alive is a daemon thread, so that it does not keep the
+				process alive if close is never called.
+        @param[in] adaptive_timeout	Extend the idle timeout to twice the average idle period.
+        @param[in] max_timeout_s	Upper bound for the adaptive idle timeout.
+        @param[in] max_workers	Maximum number of threads running jobs in parallel.
+        @param[in] ordering_key	Callable job => key, for jobs posted without a key.
         """
-        self._onerror = None
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        if min_threads > max_workers:
+            raise ValueError('min_threads must not exceed max_workers')
+        self._onerror = onerror
         if timeout_s is None:
             self._timeout_s = 1
         else:
             self._timeout_s = timeout_s
-        self._lock = threading.RLock()
-        self._thread = None
-        self._work_queue = queue.Queue() # sending None means to end the thread, anything else is a new job
-        self._number_of_jobs_pending = 0
-
-        # Passing a token object from one _WorkerThread to the next ensures that only one
-        # _WorkerThread can run at a time.
-        self._thread_ordering_queue = queue.Queue()
-        self._thread_ordering_queue.put(None)
+        self._min_threads = min_threads
+        self._adaptive_timeout = adaptive_timeout
+        self._max_timeout_s = max_timeout_s
+        self._max_workers = max_workers
+        self._ordering_key = ordering_key
+        self._idle_since = None # time.monotonic() when the threads last ran out of jobs
+        self._mean_idle_s = None # moving average of the time from running out of jobs to a new job
+        self._threads_created = 0
+        self._threads_retired = 0
+        self._jobs_for_running_thread = 0 # job submissions that found a thread already running
+        # A single lock protects everything.  Submitting a job takes it once, and a thread takes
+        # it once per job, to finish one job and fetch the next.
+        self._cond = threading.Condition(threading.Lock())
+        self._number_of_threads = 0
+        self._number_of_threads_waiting = 0 # threads waiting on self._cond for jobs, and not yet notified
+        self._number_of_wakeups_pending = 0 # threads notified, that have yet to get the lock back
+        self._closed = False
+        # Priority 0 jobs, the common case, are kept in FIFO order in a deque of (job, key).  Other
+        # priorities go in a heap of (-priority, sequence number, job, key).
+        self._jobs = collections.deque()
+        self._prioritised_jobs = []
+        self._sequence = itertools.count()
+        self._number_of_jobs_pending = 0 # queued or running
+        # Ordering keys of the jobs currently running, and jobs held back because a job with the
+        # same key was running.  The thread that finishes the running job takes the next held job.
+        self._running_keys = set()
+        self._held_jobs = {} # key => deque of jobs
 
-    def job(self, job):
-        with self._lock:
-            if self._work_queue is None:
+    def job(self, job, priority=0, key=None):
+        """!
+        @brief Post a callable to run on the worker thread.
+        @param[in] job		A callable taking no arguments.
+        @param[in] priority	Jobs with a higher priority run before jobs with a lower priority.
+        @param[in] key		Ordering key.  Only matters with max_workers > 1.
+        """
+        if key is None and self._ordering_key is not None:
+            key = self._ordering_key(job)
+        with self._cond:
+            if self._closed:
                 raise RuntimeError('closed')
-            self._work_queue.put(job)
-            if self._thread is None:
-                self._thread = _WorkerThread(self)
-                self._thread.start()
+            if priority == 0:
+                self._jobs.append((job, key))
+            else:
+                heapq.heappush(self._prioritised_jobs, (-priority, next(self._sequence), job, key))
             self._number_of_jobs_pending += 1
+            self._wake(1)
+
+    def job_many(self, jobs, priority=0, key=None):
+        """!
+        @brief Post a number of callables at once, same as calling job for each, only faster.
+        @param[in] jobs		An iterable of callables taking no arguments.
+        @param[in] priority	The priority of all of them.
+        @param[in] key		The ordering key of all of them.
+        """
+        if key is None and self._ordering_key is not None:
+            entries = [(job, self._ordering_key(job)) for job in jobs]
+        else:
+            entries = [(job, key) for job in jobs]
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('closed')
+            if priority == 0:
+                self._jobs.extend(entries)
+            else:
+                for job,key in entries:
+                    heapq.heappush(self._prioritised_jobs, (-priority, next(self._sequence), job, key))
+            self._number_of_jobs_pending += len(entries)
+            if len(entries) > 0:
+                self._wake(len(entries))
+
+    def _wake(self, number_of_jobs):
+        # Called with self._cond held, after queuing jobs.
+        if self._idle_since is not None:
+            idle_s = time.monotonic() - self._idle_since
+            self._idle_since = None
+            if self._mean_idle_s is None:
+                self._mean_idle_s = idle_s
+            else:
+                self._mean_idle_s = 0.7*self._mean_idle_s + 0.3*idle_s
+        # A notified thread only takes the lock back later, so it's taken off the waiting count
+        # here, or the next submission would count on the same thread.
+        notify = min(number_of_jobs, self._number_of_threads_waiting)
+        if notify > 0:
+            self._number_of_threads_waiting -= notify
+            self._number_of_wakeups_pending += notify
+            self._cond.notify(notify)
+        start = min(number_of_jobs - notify, self._max_workers - self._number_of_threads)
+        if start > 0:
+            self._threads_created += start
+            self._number_of_threads += start
+            for _ in range(start):
+                thread = _WorkerThread(self)
+                thread.daemon = self._min_threads > 0
+                thread.start()
+        else:
+            self._jobs_for_running_thread += 1
+
+    def _pop_job(self):
+        # Called with self._cond held.  Returns (job, key) for the next job to run, or (None, None).
+        # Jobs whose key is running are set aside in self._held_jobs.
+        while 1:
+            prioritised = self._prioritised_jobs
+            if prioritised and (prioritised[0][0] < 0 or not self._jobs):
+                _, _, job, key = heapq.heappop(prioritised)
+            elif self._jobs:
+                job, key = self._jobs.popleft()
+            else:
+                return None, None
+            if key is None or self._max_workers == 1:
+                return job, None
+            elif key in self._running_keys:
+                self._held_jobs.setdefault(key, collections.deque()).append(job)
+            else:
+                self._running_keys.add(key)
+                return job, key
+
+    def _job_done(self, key):
+        # Called with self._cond held, after running a job.  Returns (job, key) for the next job.
+        self._number_of_jobs_pending -= 1
+        if key is not None:
+            held = self._held_jobs.get(key)
+            if held:
+                job = held.popleft()
+                if not held:
+                    del self._held_jobs[key]
+                return job, key # key stays in _running_keys
+            self._running_keys.discard(key)
+        return self._pop_job()
+
+    def _idle_timeout_s(self):
+        # Called with self._cond held.  How long an idle thread waits for a job before shutting
+        # down, or None to wait indefinitely.
+        if self._number_of_threads <= self._min_threads:
+            return None
+        timeout_s = self._timeout_s
+        if self._adaptive_timeout and self._mean_idle_s is not None:
+            timeout_s = max(timeout_s, min(self._max_timeout_s, 2*self._mean_idle_s))
+        return timeout_s
 
     def peek_idle(self):
         """!
@@ -45,19 +191,37 @@ class WorkerThread:
         @detail
         Subject to race conditions.
         """
-        with self._lock:
+        with self._cond:
             return self._number_of_jobs_pending == 0
 
+    def stats(self):
+        """!
+        @brief Thread churn counters.
+        @return A dict with:
+            threads_created	Number of threads started.
+            threads_retired	Number of threads shut down, idle or closed.
+            threads		Number of threads currently alive.
+            jobs_reusing_thread	Number of job submissions that didn't start a new thread.
+            idle_timeout_s	The current idle timeout, None if kept warm.
+        """
+        with self._cond:
+            return dict(
+                threads_created=self._threads_created,
+                threads_retired=self._threads_retired,
+                threads=self._number_of_threads,
+                jobs_reusing_thread=self._jobs_for_running_thread,
+                idle_timeout_s=self._idle_timeout_s(),
+                )
+
     def close(self):
         """!
         @brief Shut down the worker thread and cease to accept new jobs.
+        @detail
+        Jobs already posted still run.
         """
-        with self._lock:
-            q = self._work_queue
-            if q is None:
-                return
-            self._work_queue = None
-        q.put(None)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
 
         
 class _WorkerThread(threading.Thread):
@@ -66,36 +230,239 @@ class _WorkerThread(threading.Thread):
         self._owner = owner
 
     def run(self):
+        # A thread leaves owner._number_of_threads, under the lock, only once it has decided not to
+        # run any more jobs.  So with max_workers=1, a new thread can start straight away, even
+        # if the old one has yet to finish exiting.
         owner = self._owner
         del self._owner
+        cond = owner._cond
 
-        # Ensure that the previous thread is done with its last job.
-        owner._thread_ordering_queue.get()
-        try:
-            while 1:
-                try:
-                    job = owner._work_queue.get(block=True, timeout=owner._timeout_s)
-                except queue.Empty:
-                    with owner._lock:
-                        # Repeat the test to avoid a race condition.
-                        if owner._work_queue.empty():
-                            owner._thread = None
+        with cond:
+            job,key = owner._pop_job()
+        while 1:
+            if job is None:
+                with cond:
+                    job,key = owner._pop_job()
+                    if job is None and owner._number_of_jobs_pending == 0 and owner._adaptive_timeout:
+                        owner._idle_since = time.monotonic()
+                    while job is None:
+                        if owner._closed:
+                            self._retire(owner)
                             return
+                        owner._number_of_threads_waiting += 1
+                        notified = cond.wait(owner._idle_timeout_s())
+                        # Whether or not this thread is the one notified, one fewer is waiting.
+                        # Should it have timed out while another is notified, it takes that
+                        # thread's job.
+                        if owner._number_of_wakeups_pending > 0:
+                            owner._number_of_wakeups_pending -= 1
                         else:
-                            continue
-
-                if job is None:
-                    break
-                try:
-                    job()
-                except:
-                    if owner._onerror is not None:
-                        owner._onerror(sys.exc_info())
+                            owner._number_of_threads_waiting -= 1
+                        job,key = owner._pop_job()
+                        if job is None and not notified and owner._number_of_threads > owner._min_threads:
+                            # Idle for too long: Shut down.  A later job starts a new thread.
+                            self._retire(owner)
+                            return
+            try:
+                job()
+            except:
+                if owner._onerror is not None:
+                    owner._onerror(sys.exc_info())
+                else:
+                    logger.error("Background task failed", exc_info=sys.exc_info())
+            job = None
+            with cond:
+                job,key = owner._job_done(key)
+
+    def _retire(self, owner):
+        # Called with owner._cond held.
+        owner._number_of_threads -= 1
+        owner._threads_retired += 1
+
+
+class WorkerPool:
+    """!
+    @brief A bounded set of worker threads, shared among any number of PoolWorker's.
+    @detail
+    Threads are created on demand, up to max_workers at a time, and shut down after timeout_s of
+    inactivity, just like the WorkerThread thread.
+    """
+    def __init__(self, max_workers=None, onerror=None, timeout_s=None):
+        """!
+        @param[in] max_workers	Maximum number of threads (default: CPU count + 4, at most 32).
+        @param[in] onerror	Called when a job fails with an exception.
+        @param[in] timeout_s	Idle duration before a thread is shuttered (default 1).
+        """
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        self._max_workers = max_workers
+        self._onerror = onerror
+        if timeout_s is None:
+            self._timeout_s = 1
+        else:
+            self._timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._work_queue = queue.PriorityQueue() # job None means to end a thread, anything else is a new job
+        self._sequence = itertools.count()
+        self._closed = False
+        self._number_of_threads = 0
+        self._number_of_jobs_pending = 0 # queued or running
+
+    def worker(self):
+        """!
+        @brief Create a new PoolWorker, which runs its jobs one at a time on this pool.
+        """
+        return PoolWorker(self)
+
+    def job(self, job, priority=0):
+        """!
+        @brief Run a callable on any of the pool threads.
+        @param[in] job		A callable taking no arguments.
+        @param[in] priority	Jobs with a higher priority are started before jobs with a lower priority.
+        @detail
+        No ordering is guaranteed between jobs posted directly to the pool, other than the order
+        in which they are started.  Use a PoolWorker for jobs that must run one at a time, in order.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('closed')
+            self._work_queue.put((-priority, next(self._sequence), job))
+            self._number_of_jobs_pending += 1
+            if self._number_of_jobs_pending > self._number_of_threads and self._number_of_threads < self._max_workers:
+                self._number_of_threads += 1
+                _PoolThread(self).start()
+
+    def number_of_threads(self):
+        """!
+        @brief The number of threads currently alive in the pool.
+        """
+        with self._lock:
+            return self._number_of_threads
+
+    def peek_idle(self):
+        """!
+        @brief Check if all the pool threads are idle.
+        @return True if idle.
+        @detail
+        Subject to race conditions.
+        """
+        with self._lock:
+            return self._number_of_jobs_pending == 0
+
+    def close(self):
+        """!
+        @brief Shut down the pool threads once the queued jobs are done, and cease to accept new jobs.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in range(self._number_of_threads):
+                self._work_queue.put(_last_in_line + (next(self._sequence), None))
+
+
+class _PoolThread(threading.Thread):
+    def __init__(self, owner):
+        threading.Thread.__init__(self)
+        self._owner = owner
+
+    def run(self):
+        owner = self._owner
+        del self._owner
+        while 1:
+            try:
+                _, _, job = owner._work_queue.get(block=True, timeout=owner._timeout_s)
+            except queue.Empty:
+                with owner._lock:
+                    # Repeat the test to avoid a race condition.
+                    if owner._work_queue.empty():
+                        owner._number_of_threads -= 1
+                        return
                     else:
-                        logger.error("Background task failed", exc_info=sys.exc_info())
-                job = None
+                        continue
+
+            if job is None:
                 with owner._lock:
-                    owner._number_of_jobs_pending -= 1
-                
+                    owner._number_of_threads -= 1
+                return
+            try:
+                job()
+            except:
+                if owner._onerror is not None:
+                    owner._onerror(sys.exc_info())
+                else:
+                    logger.error("Background task failed", exc_info=sys.exc_info())
+            job = None
+            with owner._lock:
+                owner._number_of_jobs_pending -= 1
+
+
+class PoolWorker:
+    """!
+    @brief A WorkerThread lookalike that runs its jobs on a shared WorkerPool.
+    @detail
+    Jobs posted to the same PoolWorker run one at a time, in order of priority, same as with a
+    WorkerThread.  Jobs posted to different PoolWorker's run in parallel, as far as the pool size
+    allows.
+    """
+    def __init__(self, pool):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._jobs = [] # heap of (-priority, sequence number, job)
+        self._sequence = itertools.count()
+        self._scheduled = False # True while a _run_next is queued on or running on the pool
+        self._closed = False
+
+    def job(self, job, priority=0):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('closed')
+            heapq.heappush(self._jobs, (-priority, next(self._sequence), job))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._pool.job(self._run_next, priority)
+
+    def job_many(self, jobs, priority=0):
+        """!
+        @brief Post a number of callables at once, same as calling job for each.
+        """
+        for job in jobs:
+            self.job(job, priority)
+
+    def _run_next(self):
+        # Runs a single job, then goes to the back of the pool queue, so that a busy PoolWorker
+        # doesn't starve the others.  It queues with the priority of its next job.
+        with self._lock:
+            _, _, job = heapq.heappop(self._jobs)
+        try:
+            job()
         finally:
-            owner._thread_ordering_queue.put(None) # hand over to the next thread
+            job = None
+            with self._lock:
+                if len(self._jobs) == 0:
+                    self._scheduled = False
+                    next_priority = None
+                else:
+                    next_priority = -self._jobs[0][0]
+            if next_priority is not None:
+                self._pool.job(self._run_next, next_priority)
+
+    def peek_idle(self):
+        """!
+        @brief Check if the worker is idle.
+        @return True if idle.
+        @detail
+        Subject to race conditions.
+        """
+        with self._lock:
+            return not self._scheduled
+
+    def close(self):
+        """!
+        @brief Cease to accept new jobs.  Jobs already posted still run.
+        """
+        with self._lock:
+            self._closed = True
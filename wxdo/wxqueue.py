@@ -1,4 +1,4 @@
-import wx.lib.newevent, queue, weakref
+import wx.lib.newevent, queue, weakref, heapq, itertools, time
 
 QueueEvent, EVT_QUEUE = wx.lib.newevent.NewEvent()
 
@@ -11,14 +11,20 @@ class WxQueue(queue.Queue):
     """WxQueue: Subclass of Queue.Queue for communicating values to a
     wx event handler.  Inserting an item into this Queue sends a
     message to a wxEventHandler, triggering an on-item callback.
+    Items with a higher priority are handled first, and items with
+    the same priority in FIFO order.
     """
-    def __init__(self, wxevthandler, onreceiveitem, maxsize=0):
+    def __init__(self, wxevthandler, onreceiveitem, maxsize=0, time_budget_s=None):
         """wxevthandler: The wx.Window (or other wx.EvtHandler subclass)
                object that is to receive queue events.
          onreceiveitem: Queue receive callback. A callable taking a
                two arguments, wxevthandler and the item put into the queue.
+         time_budget_s: If not None, the maximum time to spend calling
+               onreceiveitem per wx event.  Remaining items are handled
+               in a new event, so that other events get a chance to run.
         """
         queue.Queue.__init__(self, maxsize)
+        self.__time_budget_s = time_budget_s
         self.__unhandled = False
         self.__onreceiveitem = None
         self.__wxevthandler_wr = lambda:None
@@ -29,17 +35,79 @@ class WxQueue(queue.Queue):
             assert onreceiveitem is None
             self.Unbind()
 
-    def put(self, item, block=True, timeout=None):
-        queue.Queue.put(self, item, block, timeout)
+    def put(self, item, block=True, timeout=None, priority=0):
+        queue.Queue.put(self, (priority, item), block, timeout)
         self.__notify()
 
-    def put_nowait(self, item):
-        queue.Queue.put_nowait(self, item)
+    def put_nowait(self, item, priority=0):
+        queue.Queue.put(self, (priority, item), block=False)
         self.__notify()
 
+    # queue.Queue storage hooks, called with self.mutex held.  Items are stored in a heap, as
+    # (-priority, sequence number, put time, item).  The put time is for the latency statistics.
+    def _init(self, maxsize):
+        self.queue = []
+        self.__sequence = itertools.count()
+        self.__reset_stats()
+
+    def _put(self, priority_item):
+        priority, item = priority_item
+        heapq.heappush(self.queue, (-priority, next(self.__sequence), time.monotonic(), item))
+        if len(self.queue) > self.__max_depth:
+            self.__max_depth = len(self.queue)
+
+    def _get(self):
+        _, _, put_time, item = heapq.heappop(self.queue)
+        latency = time.monotonic() - put_time
+        self.__delivered += 1
+        self.__total_latency_s += latency
+        if latency > self.__max_latency_s:
+            self.__max_latency_s = latency
+        return item
+
+    def SetTimeBudget(self, time_budget_s):
+        """Set the maximum time to spend calling onreceiveitem per wx event.
+        None means no limit: all queued items are handled in one go.
+        """
+        self.__time_budget_s = time_budget_s
+
+    def GetStats(self):
+        """Queue statistics, as a dict:
+             depth: Number of items currently in the queue.
+             max_depth: The largest number of items that have been in the queue at once.
+             delivered: Number of items taken from the queue.
+             mean_latency_s, max_latency_s: Time from put to get.
+             reposts: Number of times the time budget ran out with items still queued.
+        """
+        with self.mutex:
+            return dict(
+                depth=len(self.queue),
+                max_depth=self.__max_depth,
+                delivered=self.__delivered,
+                mean_latency_s=self.__total_latency_s / self.__delivered if self.__delivered else 0.0,
+                max_latency_s=self.__max_latency_s,
+                reposts=self.__reposts,
+                )
+
+    def ResetStats(self):
+        """Reset the counters reported by GetStats."""
+        with self.mutex:
+            self.__reset_stats()
+
+    def __reset_stats(self):
+        self.__max_depth = 0
+        self.__delivered = 0
+        self.__total_latency_s = 0.0
+        self.__max_latency_s = 0.0
+        self.__reposts = 0
+
     def __OnEvtQueue(self, event):
         self.__unhandled = False
         wxevthandler = self.__wxevthandler_wr()
+        if self.__time_budget_s is None:
+            deadline = None
+        else:
+            deadline = time.monotonic() + self.__time_budget_s
         while 1:
             try:
                 next = self.get_nowait()
@@ -48,6 +116,12 @@ class WxQueue(queue.Queue):
             else:
                 if self.__onreceiveitem is not None:
                     self.__onreceiveitem(wxevthandler, next)
+            if deadline is not None and time.monotonic() >= deadline:
+                if not self.empty():
+                    # Out of time: Let other events in, and continue with the rest in a new event.
+                    self.__reposts += 1
+                    self.__notify()
+                break
 
     def BindReceiveItem(self, wxevthandler, onreceiveitem):
         try:
@@ -58,6 +132,11 @@ class WxQueue(queue.Queue):
         self.__wxevthandler_wr = weakref.ref(wxevthandler)
         self.__onreceiveitem = onreceiveitem
         wxevthandler.Bind(EVT_QUEUE, self.__OnEvtQueue)
+        # Items put while unbound went unannounced, and an event posted to a previous
+        # wxevthandler may never be handled: Announce any queued items afresh.
+        self.__unhandled = False
+        if not self.empty():
+            self.__notify()
 
     def Unbind(self):
         wxevthandler = self.__wxevthandler_wr()